@@ -1,7 +1,7 @@
 from __future__ import annotations
 import pygame as pg
 import numpy as np
-from const import HEIGHT, ROWS, COLS, SQSIZE, WIDTH, pieceImages, MOVELOG_HEIGHT, MOVELOG_WIDTH
+from const import HEIGHT, WIDTH
 
 
 class BoardState:
@@ -18,7 +18,6 @@ class BoardState:
                 ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"],
             ]
         )
-        self.IMAGES = pieceImages()
         self.whiteMove = True
         self.moveLog = []
         self.pieceMoveDict = {
@@ -67,9 +66,10 @@ class BoardState:
             self.blackKingLocation = (move.endSqRow, move.endSqCol)
 
         if move.isPawnPromotion:
-            promotedPiece = input("Promote to Q, R, B or N: ")
+            if not move.promotionPiece:
+                move.promotionPiece = "Q"
             self.board[move.endSqRow, move.endSqCol] = (
-                move.movedPiece[0] + promotedPiece
+                move.movedPiece[0] + move.promotionPiece
             )
 
         if move.isEnpassantMove:
@@ -130,7 +130,10 @@ class BoardState:
 
         # undo castling rights
         self.castleRightsLog.pop()
-        self.currentCastlingRights = self.castleRightsLog[-1]
+        lastRights = self.castleRightsLog[-1]
+        self.currentCastlingRights = CastleRights(
+            lastRights.wks, lastRights.bks, lastRights.wqs, lastRights.bqs
+        )
 
         if lastMove.isCastleMove:
             if lastMove.endSqCol - lastMove.startSqCol == 2:
@@ -147,6 +150,68 @@ class BoardState:
         self.checkmate = False
         self.stalemate = False
 
+    def makeNullMove(self):
+        """Pass the turn without moving, as used by null-move pruning."""
+        self.whiteMove = not self.whiteMove
+        self.enpassantPossible = ()
+        self.enpassantPossibleLogs.append(self.enpassantPossible)
+
+    def undoNullMove(self):
+        """Undo the last null move."""
+        self.whiteMove = not self.whiteMove
+        self.enpassantPossibleLogs.pop()
+        self.enpassantPossible = self.enpassantPossibleLogs[-1]
+        self.checkmate = False
+        self.stalemate = False
+
+    def copy(self, withHistory: bool = False) -> BoardState:
+        """Clone the position.
+
+        Only the position itself is copied; the move, en passant and castling
+        logs start afresh, so the clone cannot undo moves made before it was
+        taken.
+
+        Args:
+            withHistory (bool, optional): Also copy the logs, so the clone can
+                undo the game's moves. The moves themselves are shared. Defaults
+                to False.
+
+        Returns:
+            BoardState: An independent board in the same position.
+        """
+        clone = BoardState.__new__(BoardState)
+        clone.board = self.board.copy()
+        clone.whiteMove = self.whiteMove
+        clone.pieceMoveDict = {
+            "p": clone._pawnMoves,
+            "R": clone._RookMoves,
+            "B": clone._BishopMoves,
+            "N": clone._KnightMoves,
+            "Q": clone._QueenMoves,
+            "K": clone._KingMoves,
+        }
+        clone.whiteKingLocation = self.whiteKingLocation
+        clone.blackKingLocation = self.blackKingLocation
+        clone.inCheck = self.inCheck
+        clone.pins = list(self.pins)
+        clone.checks = list(self.checks)
+        clone.checkmate = self.checkmate
+        clone.stalemate = self.stalemate
+        clone.enpassantPossible = self.enpassantPossible
+        rights = self.currentCastlingRights
+        clone.currentCastlingRights = CastleRights(rights.wks, rights.bks, rights.wqs, rights.bqs)
+        if withHistory:
+            clone.moveLog = list(self.moveLog)
+            clone.enpassantPossibleLogs = list(self.enpassantPossibleLogs)
+            clone.castleRightsLog = [
+                CastleRights(r.wks, r.bks, r.wqs, r.bqs) for r in self.castleRightsLog
+            ]
+        else:
+            clone.moveLog = []
+            clone.enpassantPossibleLogs = [clone.enpassantPossible]
+            clone.castleRightsLog = [CastleRights(rights.wks, rights.bks, rights.wqs, rights.bqs)]
+        return clone
+
     # Update castle rights - whenever a rook or a king moves
     def updateCastleRights(self, move):
         if move.capturedPiece == "wR":
@@ -592,146 +657,26 @@ class BoardState:
                     Move((row, col), (row, col - 2), self.board, isCastleMove=True)
                 )
 
-    def drawBoardState(
-        self,
-        screen: pg.Surface,
-        validMoves: list[Move],
-        sqSelected: tuple[int, int],
-        lightColor: str = "white",
-        darkColor: str = "gray",
-    ):
-        """Draw the game board at the current state.
-
-        Args:
-            screen (pg.Surface): The board surface.
-            lightColor (str, optional): The color of the light squares. Defaults to "white".
-            darkColor (str, optional): The color of the dark squares. Defaults to "gray".
-
-        """
-        self._drawBoard(screen, lightColor, darkColor)
-        self.highlightSquare(screen, validMoves, sqSelected)
-        self._drawPieces(screen)
-
-    def _drawBoard(
-        self, screen: pg.Surface, lightColor: str = "white", darkColor: str = "gray"
-    ):
-        """Draw the game board base.
-
-        Args:
-            screen (pg.Surface): The game board surface.
-            lightColor (str, optional): The color of the light squares. Defaults to "white".
-            darkColor (str, optional): The color of the dark squares. Defaults to "gray".
-
-        """
-        colors = [pg.Color(lightColor), pg.Color(darkColor)]
-        for r in range(ROWS):
-            for c in range(COLS):
-                pg.draw.rect(
-                    screen,
-                    colors[(r + c) % 2],
-                    pg.Rect(c * SQSIZE, r * SQSIZE, SQSIZE, SQSIZE),
-                )
-
-    def _drawPieces(self, screen: pg.Surface):
-        """Draw the pieces in their current state.
+    def drawEndGameText(self, screen: pg.Surface, txt: str) -> pg.Rect:
+        """Draw the end of game message over the centre of the board.
 
         Args:
             screen (pg.Surface): The board surface.
+            txt (str): The message to draw.
 
+        Returns:
+            pg.Rect: The area covered by the message.
         """
-        for r in range(ROWS):
-            for c in range(COLS):
-                if self.board[r, c] != "--":
-                    screen.blit(
-                        self.IMAGES[self.board[r, c]],
-                        pg.Rect(c * SQSIZE, r * SQSIZE, SQSIZE, SQSIZE),
-                    )
-
-    def highlightSquare(
-        self, screen: pg.Surface, validMoves: list[Move], sqSelected: tuple[int, int]
-    ):
-        if self.moveLog:
-            lastMove = self.moveLog[-1]
-            s = pg.Surface((SQSIZE, SQSIZE))
-            s.set_alpha(100)
-            s.fill(pg.Color("green"))
-            screen.blit(s, (lastMove.endSqCol * SQSIZE, lastMove.endSqRow * SQSIZE))
-        if sqSelected:
-            row, col = sqSelected
-            if self.board[row, col][0] == ("w" if self.whiteMove else "b"):
-                s = pg.Surface((SQSIZE, SQSIZE))
-                s.set_alpha(100)
-                s.fill(pg.Color("blue"))
-                screen.blit(s, (col * SQSIZE, row * SQSIZE))
-                s.fill(pg.Color("yellow"))
-                for move in validMoves:
-                    if move.startSqRow == row and move.startSqCol == col:
-                        screen.blit(s, (move.endSqCol * SQSIZE, move.endSqRow * SQSIZE))
-
-    def drawMoveLog(self, screen, font):
-        moveLogRect = pg.Rect(WIDTH, 0, MOVELOG_WIDTH, MOVELOG_HEIGHT)
-        pg.draw.rect(screen, pg.Color("black"), moveLogRect)
-        move_texts = []
-        for i in range(0,len(self.moveLog), 2):
-            move_string = str(i // 2 + 1) + ". " + str(self.moveLog[i]) + " "
-            if i + 1 < len(self.moveLog):
-                move_string += str(self.moveLog[i+1]) + " "
-            move_texts.append(move_string)
-        
-        moves_per_row = 3
-        padding = 5
-        line_spacing = 2
-        text_y = padding
-        for i in range(0, len(move_texts), moves_per_row):
-            text = ""
-            for j in range(moves_per_row):
-                if i + j < len(move_texts):
-                    text += move_texts[i+j]
-            
-            text_object = font.render(text, True, pg.Color("white"))
-            textLocation = moveLogRect.move(padding, text_y)
-            screen.blit(text_object, textLocation)
-            text_y += text_object.get_height() + line_spacing
-
-    def drawEndGameText(self, screen: pg.Surface, txt: str):
         font = pg.font.SysFont("Helvetica", 32, True, False)
-        text = font.render(txt, False, pg.color("gray"))
+        text = font.render(txt, False, pg.Color("gray"))
         textLocation = pg.Rect(0, 0, WIDTH, HEIGHT).move(
             WIDTH / 2 - text.get_width() / 2, HEIGHT / 2 - text.get_height() / 2
         )
         screen.blit(text, textLocation)
-        text = font.render(text, False, pg.Color("black"))
+        text = font.render(txt, False, pg.Color("black"))
         screen.blit(text, textLocation.move(2, 2))
+        return pg.Rect(textLocation.topleft, (text.get_width() + 2, text.get_height() + 2))
 
-    def animateMove(self, screen, clock):
-        """
-        Animating a move
-        """
-        move = self.moveLog[-1] 
-        board = self.board
-        colors = [pg.Color("white"), pg.Color("gray")]
-        d_row = move.endSqRow - move.startSqRow
-        d_col = move.endSqCol - move.startSqCol
-        frames_per_square = 10  # frames to move one square
-        frame_count = (abs(d_row) + abs(d_col)) * frames_per_square
-        for frame in range(frame_count + 1):
-            row, col = (move.startSqRow + d_row * frame / frame_count, move.startSqCol + d_col * frame / frame_count)
-            self._drawBoard(screen)
-            self._drawPieces(screen)
-            # erase the piece moved from its ending square
-            color = colors[(move.endSqRow + move.endSqCol) % 2]
-            end_square = pg.Rect(move.endSqCol * SQSIZE, move.endSqRow * SQSIZE, SQSIZE, SQSIZE)
-            pg.draw.rect(screen, color, end_square)
-            # draw captured piece onto rectangle
-            if move.capturedPiece != '--':
-                if move.isEnpassantMove:
-                    enpassant_row = move.endSqRow + 1 if move.capturedPiece[0] == 'b' else move.endSqRow - 1
-                    end_square = pg.Rect(move.endSqCol * SQSIZE, enpassant_row * SQSIZE, SQSIZE, SQSIZE)
-                screen.blit(self.IMAGES[move.capturedPiece], end_square)
-            # draw moving piece
-            screen.blit(self.IMAGES[move.movedPiece], pg.Rect(col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE))
-            pg.display.flip()
-            clock.tick(60)
 
 class CastleRights:
     def __init__(self, wks, bks, wqs, bqs):
@@ -748,7 +693,13 @@ class Move:
     ColsToFiles = {v: k for k, v in filesToCols.items()}
 
     def __init__(
-        self, startSq, endSq, board, isEnpassantMove=False, isCastleMove=False
+        self,
+        startSq,
+        endSq,
+        board,
+        isEnpassantMove=False,
+        isCastleMove=False,
+        promotionPiece=None,
     ):
         self.startSqRow = startSq[0]
         self.startSqCol = startSq[1]
@@ -761,6 +712,10 @@ class Move:
             self.movedPiece == "bp" and self.endSqRow == 7
         )
 
+        # The piece letter (Q, R, B or N) to promote to. When left as None the
+        # pawn promotes to a queen.
+        self.promotionPiece = promotionPiece
+
         self.isEnpassantMove = isEnpassantMove
         if self.isEnpassantMove:
             self.capturedPiece = "wp" if self.movedPiece == "bp" else "bp"
@@ -833,15 +788,14 @@ class Move:
 
     def __str__(self) -> str:
         if self.isCastleMove:
-            return "0-0" if self.endcol == 6 else "0-0-0"
+            return "0-0" if self.endSqCol == 6 else "0-0-0"
         
         endSq = self.getRankFile(self.endSqRow, self.endSqCol)
         
         if self.movedPiece[1] == "p":
             if self.is_capture:
-                return self.ColsToFiles[self.startSqCol] + "x" + endSq
-            else:
-                return endSq + "Q" if self.isPawnPromotion else endSq
+                endSq = self.ColsToFiles[self.startSqCol] + "x" + endSq
+            return endSq + (self.promotionPiece or "Q") if self.isPawnPromotion else endSq
         
         move_string = self.movedPiece[1]
         if self.is_capture:
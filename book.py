@@ -0,0 +1,223 @@
+from __future__ import annotations
+import mmap
+import os
+import random
+import struct
+from collections import defaultdict
+from board import BoardState, Move
+from pgn import parseSan, readGames
+from zobrist import zobristKey
+
+# Polyglot entry layout: key, move, weight, learn (16 bytes, big endian).
+ENTRY = struct.Struct(">QHHI")
+PROMOTION_CODES = {"N": 1, "B": 2, "R": 3, "Q": 4}
+PROMOTION_PIECES = {v: k for k, v in PROMOTION_CODES.items()}
+
+
+def encodeMove(move: Move) -> int:
+    """Encode a move in the 16-bit Polyglot move format.
+
+    Castling is encoded as the king capturing its own rook, as Polyglot does.
+
+    Args:
+        move (Move): The move to encode.
+
+    Returns:
+        int: The encoded move.
+    """
+    endCol = move.endSqCol
+    if move.isCastleMove:
+        endCol = 7 if endCol == 6 else 0
+    promotion = PROMOTION_CODES.get(move.promotionPiece or "Q", 0) if move.isPawnPromotion else 0
+    return (
+        endCol
+        | (7 - move.endSqRow) << 3
+        | move.startSqCol << 6
+        | (7 - move.startSqRow) << 9
+        | promotion << 12
+    )
+
+
+def decodeMove(code: int) -> tuple[int, int, int, int, str]:
+    """Decode a 16-bit Polyglot move.
+
+    Args:
+        code (int): The encoded move.
+
+    Returns:
+        tuple[int, int, int, int, str]: The start row, start col, end row, end col
+            and promotion piece (None if the move is not a promotion).
+    """
+    return (
+        7 - (code >> 9 & 7),
+        code >> 6 & 7,
+        7 - (code >> 3 & 7),
+        code & 7,
+        PROMOTION_PIECES.get(code >> 12 & 7),
+    )
+
+
+class OpeningBook:
+    """A read-only opening book backed by a memory-mapped, key-sorted file.
+
+    The file is never read into memory: lookups binary search the mapping, so
+    every engine process on a host shares the same page cache copy of the book.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % ENTRY.size:
+            self._file.close()
+            raise ValueError(f"{path} is not a valid book file")
+        self.size = size // ENTRY.size
+        self._mmap = (
+            mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        )
+
+    def close(self):
+        """Release the memory mapping and the underlying file."""
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> OpeningBook:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _keyAt(self, index: int) -> int:
+        return struct.unpack_from(">Q", self._mmap, index * ENTRY.size)[0]
+
+    def getEntries(self, key: int) -> list[tuple[int, int]]:
+        """Find all book entries for a position hash.
+
+        Args:
+            key (int): The Zobrist hash of the position.
+
+        Returns:
+            list[tuple[int, int]]: The (encoded move, weight) pairs of the position.
+        """
+        low, high = 0, self.size
+        while low < high:
+            mid = (low + high) // 2
+            if self._keyAt(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        entries = []
+        for index in range(low, self.size):
+            entryKey, move, weight, _ = ENTRY.unpack_from(self._mmap, index * ENTRY.size)
+            if entryKey != key:
+                break
+            entries.append((move, weight))
+        return entries
+
+    def getMoves(self, gs: BoardState) -> list[tuple[Move, int]]:
+        """List the legal book moves of a position with their weights.
+
+        Args:
+            gs (BoardState): The position to look up.
+
+        Returns:
+            list[tuple[Move, int]]: The book moves and their weights.
+        """
+        entries = self.getEntries(zobristKey(gs))
+        if not entries:
+            return []
+        validMoves = gs.getValidMoves()
+        bookMoves = []
+        for code, weight in entries:
+            startRow, startCol, endRow, endCol, promotion = decodeMove(code)
+            for move in validMoves:
+                if move.startSqRow != startRow or move.startSqCol != startCol:
+                    continue
+                moveEndCol = move.endSqCol
+                if move.isCastleMove:
+                    moveEndCol = 7 if moveEndCol == 6 else 0
+                if move.endSqRow == endRow and moveEndCol == endCol:
+                    if move.isPawnPromotion:
+                        move.promotionPiece = promotion or "Q"
+                    bookMoves.append((move, weight))
+                    break
+        return bookMoves
+
+    def pickMove(
+        self, gs: BoardState, best: bool = False, rng: random.Random = None
+    ) -> Move:
+        """Choose a book move for the position.
+
+        Args:
+            gs (BoardState): The position to look up.
+            best (bool, optional): Always play the highest weighted move instead of
+                sampling proportionally to the weights. Defaults to False.
+            rng (random.Random, optional): The random source used for sampling.
+                Defaults to None.
+
+        Returns:
+            Move: The chosen move, or None when the position is not in the book.
+        """
+        bookMoves = [(move, weight) for move, weight in self.getMoves(gs) if weight]
+        if not bookMoves:
+            return None
+        if best:
+            return max(bookMoves, key=lambda entry: entry[1])[0]
+        rng = rng or random
+        moves, weights = zip(*bookMoves)
+        return rng.choices(moves, weights=weights)[0]
+
+
+def buildBook(
+    pgnPaths: list[str], outPath: str, maxPly: int = 20, minGames: int = 1
+) -> int:
+    """Build a book file from a collection of PGN games.
+
+    Each move played in the first `maxPly` plies scores 2 for a win, 1 for a draw
+    and 0 for a loss of the side that played it. Scores are scaled to fit the
+    16-bit weight field.
+
+    Args:
+        pgnPaths (list[str]): The PGN files to read.
+        outPath (str): The book file to write.
+        maxPly (int, optional): The number of plies of each game to include.
+            Defaults to 20.
+        minGames (int, optional): The number of games a move must appear in to be
+            kept. Defaults to 1.
+
+    Returns:
+        int: The number of entries written.
+    """
+    scores = defaultdict(int)
+    counts = defaultdict(int)
+    gs = BoardState()
+    for path in pgnPaths:
+        for headers, sanMoves in readGames(path):
+            result = headers.get("Result", "*")
+            for ply, san in enumerate(sanMoves[:maxPly]):
+                try:
+                    move = parseSan(gs, san)
+                except ValueError:
+                    break
+                entry = (zobristKey(gs), encodeMove(move))
+                counts[entry] += 1
+                if result == "1/2-1/2":
+                    scores[entry] += 1
+                elif result == ("1-0" if gs.whiteMove else "0-1"):
+                    scores[entry] += 2
+                gs.makeMove(move)
+            while gs.moveLog:
+                gs.undoMove()
+
+    entries = sorted(entry for entry, count in counts.items() if count >= minGames)
+    maxScore = max((scores[entry] for entry in entries), default=0)
+    scale = 0xFFFF / maxScore if maxScore > 0xFFFF else 1
+    with open(outPath, "wb") as f:
+        for key, move in entries:
+            weight = int(scores[(key, move)] * scale)
+            f.write(ENTRY.pack(key, move, weight, 0))
+    return len(entries)
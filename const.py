@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from typing import Dict
 import pygame as pg
 
@@ -13,9 +14,12 @@ SQSIZE = WIDTH // COLS
 MAX_FPS = 15
 
 
+@lru_cache(maxsize=None)
 def pieceImages(style: str = "classic") -> Dict[str, pg.Surface]:
     """Load chess piece images of a given style.
 
+    The images are loaded once per style and shared by every board.
+
     Args:
         style (str, optional): The piece style. Defaults to "classic".
 
@@ -0,0 +1,781 @@
+from __future__ import annotations
+import asyncio
+import threading
+from typing import AsyncIterator, Callable
+from board import BoardState, Move
+from instrumentation import TIMING_ENABLED, SearchStats, phaseTimers
+from timemanager import TimeManager
+from zobrist import zobristKey
+
+MATE_SCORE = 100000
+INFINITY = 1000000
+PIECE_SCORES = {"K": 0, "Q": 900, "R": 500, "B": 330, "N": 320, "p": 100}
+
+# Piece-square bonuses from white's point of view, rank 8 first.
+KNIGHT_TABLE = [
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20, 0, 0, 0, 0, -20, -40],
+    [-30, 0, 10, 15, 15, 10, 0, -30],
+    [-30, 5, 15, 20, 20, 15, 5, -30],
+    [-30, 0, 15, 20, 20, 15, 0, -30],
+    [-30, 5, 10, 15, 15, 10, 5, -30],
+    [-40, -20, 0, 5, 5, 0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+]
+BISHOP_TABLE = [
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+    [-10, 0, 0, 0, 0, 0, 0, -10],
+    [-10, 0, 5, 10, 10, 5, 0, -10],
+    [-10, 5, 5, 10, 10, 5, 5, -10],
+    [-10, 0, 10, 10, 10, 10, 0, -10],
+    [-10, 10, 10, 10, 10, 10, 10, -10],
+    [-10, 5, 0, 0, 0, 0, 5, -10],
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+]
+PAWN_TABLE = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [50, 50, 50, 50, 50, 50, 50, 50],
+    [10, 10, 20, 30, 30, 20, 10, 10],
+    [5, 5, 10, 25, 25, 10, 5, 5],
+    [0, 0, 0, 20, 20, 0, 0, 0],
+    [5, -5, -10, 0, 0, -10, -5, 5],
+    [5, 10, 10, -20, -20, 10, 10, 5],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+]
+PIECE_TABLES = {"N": KNIGHT_TABLE, "B": BISHOP_TABLE, "p": PAWN_TABLE}
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+ASPIRATION_WINDOW = 50
+FUTILITY_MARGINS = [0, 200, 500]
+
+
+def evaluate(gs: BoardState) -> int:
+    """Statically evaluate a position.
+
+    Args:
+        gs (BoardState): The position to evaluate.
+
+    Returns:
+        int: The score in centipawns from the side to move's point of view.
+    """
+    score = 0
+    for row, rank in enumerate(gs.board.tolist()):
+        for col, piece in enumerate(rank):
+            if piece == "--":
+                continue
+            value = PIECE_SCORES[piece[1]]
+            table = PIECE_TABLES.get(piece[1])
+            if piece[0] == "w":
+                score += value + (table[row][col] if table else 0)
+            else:
+                score -= value + (table[7 - row][col] if table else 0)
+    return score if gs.whiteMove else -score
+
+
+def _scoreToTable(score: int, ply: int) -> int:
+    """Store mate scores relative to the node rather than the root."""
+    if score >= MATE_SCORE - 1000:
+        return score + ply
+    if score <= -MATE_SCORE + 1000:
+        return score - ply
+    return score
+
+
+def _scoreFromTable(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - 1000:
+        return score - ply
+    if score <= -MATE_SCORE + 1000:
+        return score + ply
+    return score
+
+
+def _gameKeys(gs: BoardState) -> list[int]:
+    """The keys of the earlier positions of the game that can still repeat.
+
+    Positions before the last capture or pawn move can never recur, so the walk
+    back through the move log stops there.
+    """
+    board = gs.copy(withHistory=True)
+    keys = []
+    for move in reversed(gs.moveLog):
+        if move.is_capture or move.movedPiece[1] == "p":
+            break
+        board.undoMove()
+        keys.append(zobristKey(board))
+    return keys[::-1]
+
+
+def _hasPieces(gs: BoardState) -> bool:
+    """Whether the side to move has any piece besides its king and pawns."""
+    color = "w" if gs.whiteMove else "b"
+    for rank in gs.board.tolist():
+        for piece in rank:
+            if piece[0] == color and piece[1] not in "Kp":
+                return True
+    return False
+
+
+class SearchResult:
+    def __init__(
+        self,
+        bestMove: Move = None,
+        score: int = 0,
+        depth: int = 0,
+        nodes: int = 0,
+        pv: list[Move] = None,
+        stats: SearchStats = None,
+    ):
+        self.bestMove = bestMove
+        self.score = score
+        self.depth = depth
+        self.nodes = nodes
+        self.pv = pv or []
+        self.stats = stats
+
+    @property
+    def ponderMove(self) -> Move:
+        """The reply we expect from the opponent, if the search found one."""
+        return self.pv[1] if len(self.pv) > 1 else None
+
+    def __repr__(self) -> str:
+        return (
+            f"SearchResult(bestMove={self.bestMove!r}, score={self.score}, "
+            f"depth={self.depth}, nodes={self.nodes})"
+        )
+
+
+class Engine:
+    """An iterative deepening alpha-beta search over `BoardState.getValidMoves`.
+
+    The engine plays book moves and tablebase moves instantly when they are
+    available, and otherwise searches until its `TimeManager` runs out or the
+    depth limit is reached.
+    """
+
+    def __init__(
+        self,
+        book=None,
+        tablebases=None,
+        ttSize: int = 1 << 20,
+        nullMove: bool = True,
+        lateMoveReductions: bool = True,
+        principalVariation: bool = True,
+        aspiration: bool = True,
+        futility: bool = True,
+        timing: bool = TIMING_ENABLED,
+        sharedCache=None,
+    ):
+        """Create an engine.
+
+        The pruning switches exist so each technique can be A/B tested in
+        `tournament.py`; all of them are on by default.
+
+        Args:
+            book (OpeningBook, optional): The opening book to play from.
+                Defaults to None.
+            tablebases (Tablebases, optional): The endgame tables to probe.
+                Defaults to None.
+            ttSize (int, optional): The number of transposition table entries kept
+                before the table is cleared. Defaults to 1 << 20.
+            nullMove (bool, optional): Prune nodes where passing still fails high.
+                Defaults to True.
+            lateMoveReductions (bool, optional): Search quiet moves late in the
+                move ordering at reduced depth. Defaults to True.
+            principalVariation (bool, optional): Search moves after the first with a
+                null window. Defaults to True.
+            aspiration (bool, optional): Start each iteration with a window around
+                the previous score. Defaults to True.
+            futility (bool, optional): Skip quiet moves near the leaves that cannot
+                raise alpha. Defaults to True.
+            timing (bool, optional): Time the move generation phases of every
+                search into `SearchResult.stats`. Defaults to TIMING_ENABLED.
+            sharedCache (SharedCache, optional): A cache of evaluations and search
+                results shared with the engines of other processes, consulted
+                when the transposition table misses. Defaults to None.
+        """
+        self.book = book
+        self.tablebases = tablebases
+        self.ttSize = ttSize
+        self.nullMove = nullMove
+        self.lateMoveReductions = lateMoveReductions
+        self.principalVariation = principalVariation
+        self.aspiration = aspiration
+        self.futility = futility
+        self.timing = timing
+        self.sharedCache = sharedCache
+        self.tt = {}
+        self.nodes = 0
+        self.stats = SearchStats()
+        self.timeManager = None
+        self._stopEvent = threading.Event()
+        self._ponderThread = None
+        self._ponderResult = None
+        self._rootBestMove = None
+
+    def stop(self):
+        """Ask a running search to return as soon as possible."""
+        self._stopEvent.set()
+
+    def search(
+        self, gs: BoardState, timeManager: TimeManager = None, maxDepth: int = 64
+    ) -> SearchResult:
+        """Find the best move of a position.
+
+        Args:
+            gs (BoardState): The position to search. It is restored on return.
+            timeManager (TimeManager, optional): The clock of the move. Defaults to
+                None, in which case the search runs until maxDepth or `stop`.
+            maxDepth (int, optional): The deepest iteration to run. Defaults to 64.
+
+        Returns:
+            SearchResult: The best move found and its principal variation.
+        """
+        self._stopEvent.clear()
+        self.timeManager = timeManager
+        return self._iterativeDeepening(gs, maxDepth)
+
+    def _iterativeDeepening(self, gs: BoardState, maxDepth: int) -> SearchResult:
+        result = self._instrumented(self._searchRoot, gs, maxDepth)
+        result.stats = self.stats
+        return result
+
+    def _instrumented(self, searchFunction, *args):
+        """Run a search with fresh statistics, timing its phases if enabled."""
+        self.nodes = 0
+        self.stats = SearchStats()
+        if self.timing:
+            with phaseTimers(self.stats):
+                result = searchFunction(*args)
+        else:
+            result = searchFunction(*args)
+        self.stats.finish()
+        return result
+
+    def _searchRoot(self, gs: BoardState, maxDepth: int) -> SearchResult:
+        rootMoves = gs.getValidMoves()
+        if not rootMoves:
+            return SearchResult()
+
+        if self.book is not None:
+            bookMove = self.book.pickMove(gs)
+            if bookMove is not None:
+                return SearchResult(bookMove, pv=[bookMove])
+
+        if self.tablebases is not None:
+            tbMoves = self.tablebases.filterRootMoves(gs, rootMoves)
+            if tbMoves is not rootMoves:
+                result = self.tablebases.probe(gs)
+                if result is None:
+                    # The root has too many pieces, but every move captures into
+                    # a covered ending: score it from the best child.
+                    gs.makeMove(tbMoves[0])
+                    wdl, plies = self.tablebases.probe(gs)
+                    gs.undoMove()
+                    wdl, plies = -wdl, plies + 1
+                else:
+                    wdl, plies = result
+                return SearchResult(
+                    tbMoves[0], wdl * (MATE_SCORE - plies), pv=[tbMoves[0]]
+                )
+
+        # Until the first iteration completes, the best guess is the table move,
+        # else the best capture, or whatever the interrupted iteration found.
+        entry = self.tt.get(zobristKey(gs))
+        firstMove = self._orderMoves(rootMoves, entry[3] if entry else None)[0]
+        result = SearchResult(firstMove, pv=[firstMove])
+        self._rootBestMove = None
+        if len(rootMoves) == 1:
+            if self.timeManager is not None:
+                self.timeManager.setForced()
+            maxDepth = 1
+
+        # Repeating a position of the game scores as a draw, like one inside the tree.
+        path = _gameKeys(gs)
+        score = 0
+        for depth in range(1, maxDepth + 1):
+            iterationStart = self.nodes
+            score = self._aspirationSearch(gs, depth, score, path)
+            if self._stopEvent.is_set():
+                if result.depth == 0 and self._rootBestMove is not None:
+                    result = SearchResult(self._rootBestMove, pv=[self._rootBestMove])
+                break
+            self.stats.depth = depth
+            self.stats.iterationNodes.append(self.nodes - iterationStart)
+            pv = self._principalVariation(gs, depth)
+            if pv:
+                result = SearchResult(pv[0], score, depth, self.nodes, pv)
+            timeManager = self.timeManager
+            if timeManager is not None:
+                timeManager.onIteration(result.bestMove, score)
+            if abs(score) >= MATE_SCORE - depth:
+                break
+            if timeManager is not None and not timeManager.canStartIteration():
+                break
+        result.nodes = self.nodes
+        return result
+
+    def analyse(
+        self,
+        gs: BoardState,
+        multiPV: int = 3,
+        timeManager: TimeManager = None,
+        maxDepth: int = 64,
+        callback: Callable[[int, list[SearchResult]], None] = None,
+    ) -> list[SearchResult]:
+        """Find the best few moves of a position with their scores (Multi-PV).
+
+        Every iteration searches the root moves once per line, each time leaving
+        out the moves of the lines already found, so the nth line is the best
+        move that is not among the first n - 1. All lines share the
+        transposition table, and each iteration tries the previous ranking first.
+        The book and tablebases are not used.
+
+        Args:
+            gs (BoardState): The position to analyse. It is restored on return.
+            multiPV (int, optional): The number of lines. Defaults to 3.
+            timeManager (TimeManager, optional): The time allowed. Defaults to None,
+                in which case the analysis runs until maxDepth or `stop`.
+            maxDepth (int, optional): The deepest iteration to run. Defaults to 64.
+            callback (Callable[[int, list[SearchResult]], None], optional): Called
+                from the searching thread with the depth and the lines found so
+                far at that depth, best first, every time a line is completed.
+                Defaults to None.
+
+        Returns:
+            list[SearchResult]: The lines of the last completed iteration, best first,
+                or the lines completed so far if the first one was interrupted.
+        """
+        self._stopEvent.clear()
+        self.timeManager = timeManager
+        lines = self._instrumented(self._multiPV, gs, multiPV, maxDepth, callback)
+        for line in lines:
+            line.stats = self.stats
+        return lines
+
+    async def analyseStream(
+        self,
+        gs: BoardState,
+        multiPV: int = 3,
+        timeManager: TimeManager = None,
+        maxDepth: int = 64,
+    ) -> AsyncIterator[tuple[int, list[SearchResult]]]:
+        """Run `analyse` in a worker thread, yielding each update as it is found.
+
+        The position is copied, so the caller may keep using it. Leaving the
+        loop early stops the analysis.
+
+        Example:
+            async for depth, lines in engine.analyseStream(gs, 3):
+                show(depth, lines)
+        """
+        loop = asyncio.get_running_loop()
+        updates = asyncio.Queue()
+        position = gs.copy(withHistory=True)
+
+        def callback(depth: int, lines: list[SearchResult]):
+            loop.call_soon_threadsafe(updates.put_nowait, (depth, lines))
+
+        analysis = loop.run_in_executor(
+            None, self.analyse, position, multiPV, timeManager, maxDepth, callback
+        )
+        analysis.add_done_callback(lambda _: updates.put_nowait(None))
+        try:
+            while (update := await updates.get()) is not None:
+                yield update
+        finally:
+            self.stop()
+            await analysis
+
+    def _multiPV(
+        self, gs: BoardState, multiPV: int, maxDepth: int, callback
+    ) -> list[SearchResult]:
+        rootMoves = gs.getValidMoves()
+        if not rootMoves:
+            return []
+        multiPV = max(1, min(multiPV, len(rootMoves)))
+        lines = []
+        for depth in range(1, maxDepth + 1):
+            iterationStart = self.nodes
+            # Try the moves in the order of the last iteration's lines.
+            ranked = [line.bestMove for line in lines]
+            remaining = ranked + [move for move in rootMoves if move not in ranked]
+            depthLines = []
+            for _ in range(multiPV):
+                bestMove, score = self._searchMoves(gs, remaining, depth)
+                if self._stopEvent.is_set():
+                    break
+                gs.makeMove(bestMove)
+                pv = [bestMove] + self._principalVariation(gs, depth - 1)
+                gs.undoMove()
+                depthLines.append(SearchResult(bestMove, score, depth, self.nodes, pv))
+                remaining = [move for move in remaining if move is not bestMove]
+                depthLines.sort(key=lambda line: -line.score)
+                if callback is not None:
+                    callback(depth, list(depthLines))
+            if self._stopEvent.is_set():
+                # Before a full iteration, the lines already completed (and
+                # streamed) beat nothing.
+                if not lines:
+                    lines = depthLines
+                break
+            lines = depthLines
+            self.stats.depth = depth
+            self.stats.iterationNodes.append(self.nodes - iterationStart)
+            timeManager = self.timeManager
+            if timeManager is not None:
+                timeManager.onIteration(lines[0].bestMove, lines[0].score)
+                if not timeManager.canStartIteration():
+                    break
+        return lines
+
+    def _searchMoves(self, gs: BoardState, moves: list[Move], depth: int) -> tuple[Move, int]:
+        """Search a subset of the root moves with a full window.
+
+        Unlike `_negamax`, this does not store the root in the transposition
+        table, where a score over only some of the moves would be wrong.
+
+        Returns:
+            tuple[Move, int]: The best of the moves and its score.
+        """
+        path = _gameKeys(gs) + [zobristKey(gs)]
+        alpha = -INFINITY
+        bestMove, bestScore = moves[0], -INFINITY
+        for rank, move in enumerate(moves):
+            gs.makeMove(move)
+            if rank == 0 or not self.principalVariation:
+                score = -self._negamax(gs, depth - 1, -INFINITY, -alpha, 1, path)
+            else:
+                score = -self._negamax(
+                    gs, depth - 1, -alpha - 1, -alpha, 1, path, pvNode=False
+                )
+                if score > alpha:
+                    score = -self._negamax(gs, depth - 1, -INFINITY, -alpha, 1, path)
+            gs.undoMove()
+            if self._stopEvent.is_set():
+                break
+            if score > bestScore:
+                bestMove, bestScore = move, score
+            alpha = max(alpha, score)
+        return bestMove, bestScore
+
+    def _aspirationSearch(
+        self, gs: BoardState, depth: int, previousScore: int, path: list[int]
+    ) -> int:
+        """Search the root in a window around the previous iteration's score.
+
+        The window is widened on the failing side until the score falls inside it.
+        """
+        if not self.aspiration or depth < 3 or abs(previousScore) >= MATE_SCORE - 1000:
+            return self._negamax(gs, depth, -INFINITY, INFINITY, 0, path)
+        delta = ASPIRATION_WINDOW
+        alpha, beta = previousScore - delta, previousScore + delta
+        while True:
+            score = self._negamax(gs, depth, alpha, beta, 0, path)
+            if self._stopEvent.is_set():
+                return score
+            self.stats.aspirationFails += score <= alpha or score >= beta
+            if score <= alpha:
+                alpha = max(alpha - delta, -INFINITY)
+            elif score >= beta:
+                beta = min(beta + delta, INFINITY)
+            else:
+                return score
+            delta *= 2
+
+    def _stopped(self) -> bool:
+        if self._stopEvent.is_set():
+            return True
+        timeManager = self.timeManager
+        if timeManager is not None and self.nodes & 15 == 0 and timeManager.shouldStop():
+            self._stopEvent.set()
+            return True
+        return False
+
+    def _negamax(
+        self,
+        gs: BoardState,
+        depth: int,
+        alpha: int,
+        beta: int,
+        ply: int,
+        path: list[int],
+        allowNull: bool = True,
+        pvNode: bool = True,
+    ) -> int:
+        self.nodes += 1
+        stats = self.stats
+        stats.nodes += 1
+        if self._stopped():
+            return 0
+        key = zobristKey(gs)
+        if ply > 0 and key in path:
+            return 0
+
+        stats.ttProbes += 1
+        entry = self.tt.get(key)
+        if entry is None and self.sharedCache is not None:
+            entry = self.sharedCache.getResult(key)
+        ttMove = None
+        if entry is not None:
+            stats.ttHits += 1
+            entryDepth, entryScore, entryFlag, ttMove = entry
+            if ply > 0 and entryDepth >= depth:
+                entryScore = _scoreFromTable(entryScore, ply)
+                if (
+                    entryFlag == EXACT
+                    or (entryFlag == LOWER and entryScore >= beta)
+                    or (entryFlag == UPPER and entryScore <= alpha)
+                ):
+                    stats.ttCutoffs += 1
+                    return entryScore
+
+        if ply > 0 and self.tablebases is not None:
+            result = self.tablebases.probe(gs)
+            if result is not None:
+                wdl, plies = result
+                return wdl * (MATE_SCORE - ply - plies)
+
+        if depth <= 0:
+            return self._quiescence(gs, alpha, beta, ply)
+
+        moves = gs.getValidMoves()
+        inCheck = gs.inCheck
+        if not moves:
+            return -MATE_SCORE + ply if inCheck else 0
+
+        path.append(key)
+
+        # Null move: if passing still fails high, a real move would too. Skipped
+        # when only pawns are left, where passing may be the best move (zugzwang).
+        if (
+            self.nullMove
+            and allowNull
+            and not pvNode
+            and not inCheck
+            and depth >= 3
+            and abs(beta) < MATE_SCORE - 1000
+            and _hasPieces(gs)
+        ):
+            reduction = 2 + depth // 6
+            stats.nullMoveTries += 1
+            gs.makeNullMove()
+            score = -self._negamax(
+                gs, depth - 1 - reduction, -beta, -beta + 1, ply + 1, path, False, False
+            )
+            gs.undoNullMove()
+            if self._stopEvent.is_set():
+                path.pop()
+                return 0
+            if score >= beta:
+                stats.nullMoveCutoffs += 1
+                path.pop()
+                return beta
+
+        futile = False
+        staticEval = None
+        if (
+            self.futility
+            and not pvNode
+            and not inCheck
+            and depth < len(FUTILITY_MARGINS)
+            and abs(alpha) < MATE_SCORE - 1000
+        ):
+            staticEval = self._evaluate(gs, key)
+            futile = staticEval + FUTILITY_MARGINS[depth] <= alpha
+
+        originalAlpha = alpha
+        bestScore = -INFINITY
+        bestMove = None
+        for rank, move in enumerate(self._orderMoves(moves, ttMove)):
+            quiet = not move.is_capture and not move.isPawnPromotion
+            if futile and quiet and bestMove is not None:
+                stats.futilityPrunes += 1
+                bestScore = max(bestScore, staticEval + FUTILITY_MARGINS[depth])
+                continue
+
+            gs.makeMove(move)
+            # Only the first move of a PV node leads to another PV node; the
+            # rest are expected to fail low whatever window they get.
+            childPV = pvNode and rank == 0
+            reduction = 0
+            if (
+                self.lateMoveReductions
+                and depth >= 3
+                and rank >= 3
+                and quiet
+                and not inCheck
+            ):
+                reduction = 1 if rank < 6 else 2
+                reduction = min(reduction, depth - 2)
+                stats.lmrReductions += 1
+                score = -self._negamax(
+                    gs, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1, path,
+                    pvNode=False,
+                )
+                if score > alpha:
+                    stats.lmrResearches += 1
+            # A reduced move that beats alpha is searched again at full depth.
+            if not reduction or score > alpha:
+                if rank == 0 or not self.principalVariation:
+                    score = -self._negamax(
+                        gs, depth - 1, -beta, -alpha, ply + 1, path, pvNode=childPV
+                    )
+                else:
+                    score = -self._negamax(
+                        gs, depth - 1, -alpha - 1, -alpha, ply + 1, path, pvNode=False
+                    )
+                    if alpha < score < beta:
+                        stats.pvsResearches += 1
+                        score = -self._negamax(
+                            gs, depth - 1, -beta, -alpha, ply + 1, path, pvNode=pvNode
+                        )
+            gs.undoMove()
+            if self._stopEvent.is_set():
+                path.pop()
+                return 0
+            if score > bestScore:
+                bestScore = score
+                bestMove = move
+                if ply == 0:
+                    self._rootBestMove = move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                stats.betaCutoffs += 1
+                stats.firstMoveCutoffs += rank == 0
+                break
+        path.pop()
+
+        flag = EXACT
+        if bestScore <= originalAlpha:
+            flag = UPPER
+        elif bestScore >= beta:
+            flag = LOWER
+        self._store(
+            key,
+            depth,
+            _scoreToTable(bestScore, ply),
+            flag,
+            bestMove.MoveID if bestMove else ttMove,
+        )
+        return bestScore
+
+    def _quiescence(self, gs: BoardState, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        self.stats.qnodes += 1
+        if self._stopped():
+            return 0
+        standPat = self._evaluate(gs)
+        if standPat >= beta:
+            return standPat
+        alpha = max(alpha, standPat)
+        captures = [move for move in gs.getValidMoves() if move.is_capture]
+        for move in self._orderMoves(captures, None):
+            gs.makeMove(move)
+            score = -self._quiescence(gs, -beta, -alpha, ply + 1)
+            gs.undoMove()
+            if self._stopEvent.is_set():
+                return 0
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    def _orderMoves(self, moves: list[Move], ttMove: int) -> list[Move]:
+        """Search the table move first, then captures by MVV-LVA, then quiet moves."""
+
+        def moveKey(move: Move) -> int:
+            if move.MoveID == ttMove:
+                return -INFINITY
+            if move.is_capture:
+                return -10 * PIECE_SCORES[move.capturedPiece[1]] + PIECE_SCORES[
+                    move.movedPiece[1]
+                ] // 100
+            return 0
+
+        return sorted(moves, key=moveKey)
+
+    def _evaluate(self, gs: BoardState, key: int = None) -> int:
+        if self.sharedCache is None:
+            return evaluate(gs)
+        if key is None:
+            key = zobristKey(gs)
+        score = self.sharedCache.getEval(key)
+        if score is None:
+            score = evaluate(gs)
+            self.sharedCache.putEval(key, score)
+        return score
+
+    def _store(self, key: int, depth: int, score: int, flag: int, moveID: int):
+        if len(self.tt) >= self.ttSize and key not in self.tt:
+            self.tt.clear()
+        self.tt[key] = (depth, score, flag, moveID)
+        if self.sharedCache is not None:
+            self.sharedCache.putResult(key, depth, score, flag, moveID)
+
+    def _principalVariation(self, gs: BoardState, depth: int) -> list[Move]:
+        """Follow the table moves from the root to rebuild the principal variation."""
+        pv = []
+        seen = set()
+        for _ in range(depth):
+            key = zobristKey(gs)
+            entry = self.tt.get(key)
+            if entry is None or key in seen:
+                break
+            seen.add(key)
+            move = next(
+                (move for move in gs.getValidMoves() if move.MoveID == entry[3]), None
+            )
+            if move is None:
+                break
+            pv.append(move)
+            gs.makeMove(move)
+        for _ in pv:
+            gs.undoMove()
+        return pv
+
+    def startPondering(self, gs: BoardState, ponderMove: Move):
+        """Search the position after the expected reply during the opponent's turn.
+
+        The search runs on a copy of the position in a background thread without a
+        time limit until `ponderHit` or `stopPondering` is called.
+
+        Args:
+            gs (BoardState): The game, with our last move already made.
+            ponderMove (Move): The reply we expect from the opponent.
+        """
+        self.stopPondering()
+        ponderBoard = gs.copy(withHistory=True)
+        ponderBoard.makeMove(ponderMove)
+        self._ponderResult = None
+        self._stopEvent.clear()
+        self.timeManager = None
+
+        def run():
+            self._ponderResult = self._iterativeDeepening(ponderBoard, 64)
+
+        self._ponderThread = threading.Thread(target=run, daemon=True)
+        self._ponderThread.start()
+
+    def ponderHit(self, timeManager: TimeManager) -> SearchResult:
+        """Turn the ponder search into the real search once the expected reply is played.
+
+        Args:
+            timeManager (TimeManager): The clock of our move, started now.
+
+        Returns:
+            SearchResult: The result of the search, which keeps the depth it already
+                reached while pondering.
+        """
+        timeManager.start()
+        self.timeManager = timeManager
+        self._ponderThread.join()
+        self._ponderThread = None
+        return self._ponderResult
+
+    def stopPondering(self):
+        """Abandon the ponder search, e.g. when the opponent played another move."""
+        if self._ponderThread is not None:
+            self.stop()
+            self._ponderThread.join()
+            self._ponderThread = None
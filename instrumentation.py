@@ -0,0 +1,323 @@
+from __future__ import annotations
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+# Set CHESS_ENGINE_TIMING=1 to time move generation phases in every search.
+TIMING_ENABLED = os.environ.get("CHESS_ENGINE_TIMING", "") not in ("", "0")
+
+# The BoardState methods timed by `phaseTimers`. Times are inclusive, so
+# getValidMoves also contains the checkForPinsAndChecks and _isUnderAttack
+# calls it makes.
+TIMED_METHODS = [
+    "getValidMoves",
+    "getAllPossibleMoves",
+    "checkForPinsAndChecks",
+    "_isUnderAttack",
+    "makeMove",
+    "undoMove",
+]
+
+
+class SearchStats:
+    """Counters and timers collected during one search or perft run."""
+
+    COUNTERS = [
+        "nodes",
+        "qnodes",
+        "ttProbes",
+        "ttHits",
+        "ttCutoffs",
+        "betaCutoffs",
+        "firstMoveCutoffs",
+        "nullMoveTries",
+        "nullMoveCutoffs",
+        "lmrReductions",
+        "lmrResearches",
+        "pvsResearches",
+        "futilityPrunes",
+        "aspirationFails",
+    ]
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.depth = 0
+        self.iterationNodes = []
+        self.timers = {}
+        self.startTime = time.perf_counter()
+        self.elapsed = 0.0
+
+    def addTime(self, phase: str, seconds: float):
+        calls, total = self.timers.get(phase, (0, 0.0))
+        self.timers[phase] = (calls + 1, total + seconds)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.startTime
+
+    def branchingFactor(self) -> float:
+        """The effective branching factor, from the node growth of the last iterations."""
+        if len(self.iterationNodes) >= 2 and self.iterationNodes[-2]:
+            return self.iterationNodes[-1] / self.iterationNodes[-2]
+        return 0.0
+
+    def toDict(self) -> dict:
+        """Export the statistics with derived rates.
+
+        Returns:
+            dict: The raw counters, per-phase timers and derived ratios.
+        """
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        total = self.nodes + self.qnodes
+        stats.update(
+            {
+                "depth": self.depth,
+                "elapsed": self.elapsed,
+                "nps": total / self.elapsed if self.elapsed else 0.0,
+                "ttHitRate": self.ttHits / self.ttProbes if self.ttProbes else 0.0,
+                "firstMoveCutoffRate": (
+                    self.firstMoveCutoffs / self.betaCutoffs if self.betaCutoffs else 0.0
+                ),
+                "branchingFactor": self.branchingFactor(),
+                "iterationNodes": list(self.iterationNodes),
+                "timers": {
+                    phase: {"calls": calls, "seconds": seconds}
+                    for phase, (calls, seconds) in sorted(self.timers.items())
+                },
+            }
+        )
+        return stats
+
+    def toJson(self, path: str = None) -> str:
+        """Serialize the statistics as JSON, optionally writing them to a file."""
+        text = json.dumps(self.toDict(), indent=2)
+        if path:
+            with open(path, "w") as f:
+                f.write(text)
+        return text
+
+
+_timerLock = threading.Lock()
+# The classes currently wrapped by `phaseTimers`, mapped to their original
+# methods and the (statistics, thread id) of every block timing them.
+_patched = {}
+
+
+@contextmanager
+def phaseTimers(stats: SearchStats, cls=None):
+    """Time the move generation phases of BoardState while the block runs.
+
+    The methods are wrapped on the class when the first block starts and
+    restored when the last one ends, so nothing is paid when timing is off.
+    The wrappers are process-wide, but a call is only added to the blocks
+    entered by the calling thread, so a ponder search next to the UI's engine
+    thread does not count the other's calls.
+
+    Args:
+        stats (SearchStats): The statistics the timings are added to.
+        cls (type, optional): The class to instrument. Defaults to BoardState.
+    """
+    if cls is None:
+        from board import BoardState
+
+        cls = BoardState
+    with _timerLock:
+        if cls not in _patched:
+            originals = {name: cls.__dict__[name] for name in TIMED_METHODS}
+            active = []
+            _patched[cls] = (originals, active)
+            for name, method in originals.items():
+                setattr(cls, name, _timed(name, method, active))
+        block = (stats, threading.get_ident())
+        _patched[cls][1].append(block)
+    try:
+        yield stats
+    finally:
+        with _timerLock:
+            originals, active = _patched[cls]
+            active.remove(block)
+            if not active:
+                for name, method in originals.items():
+                    setattr(cls, name, method)
+                del _patched[cls]
+
+
+def _timed(phase: str, method, active: list[tuple[SearchStats, int]]):
+    clock = time.perf_counter
+    getIdent = threading.get_ident
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            ident = getIdent()
+            for stats, owner in tuple(active):
+                if owner == ident:
+                    stats.addTime(phase, elapsed)
+
+    return wrapper
+
+
+def profiled(fn, *args, sortBy: str = "cumulative", limit: int = 25, **kwargs):
+    """Run a function under cProfile.
+
+    Args:
+        fn (callable): The function to profile, e.g. `engine.search`.
+        sortBy (str, optional): The pstats sort key. Defaults to "cumulative".
+        limit (int, optional): The number of functions reported. Defaults to 25.
+
+    Returns:
+        tuple: The return value of fn and the formatted profile report.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args, **kwargs)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sortBy).print_stats(limit)
+    return result, out.getvalue()
+
+
+class Sampler:
+    """A low-overhead sampling profiler for a running thread.
+
+    A background thread records the innermost frames of the target thread
+    every `interval` seconds, which is cheap enough to leave on in production.
+
+    Example:
+        with Sampler() as sampler:
+            engine.search(gs, timeManager)
+        print(sampler.report())
+    """
+
+    def __init__(self, threadId: int = None, interval: float = 0.005, depth: int = 3):
+        self.threadId = threadId or threading.get_ident()
+        self.interval = interval
+        self.depth = depth
+        self.samples = Counter()
+        self._stopEvent = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> Sampler:
+        self._stopEvent.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stopEvent.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopEvent.wait(self.interval):
+            frame = sys._current_frames().get(self.threadId)
+            stack = []
+            while frame is not None and len(stack) < self.depth:
+                stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[" <- ".join(stack)] += 1
+
+    def report(self, limit: int = 20) -> str:
+        total = sum(self.samples.values())
+        lines = [f"{total} samples"]
+        for stack, count in self.samples.most_common(limit):
+            lines.append(f"{100 * count / total:5.1f}%  {stack}")
+        return "\n".join(lines)
+
+
+def perft(gs, depth: int, stats: SearchStats = None) -> int:
+    """Count the leaf nodes of the legal move tree, to test and time move generation.
+
+    Args:
+        gs (BoardState): The position to start from. It is restored on return.
+        depth (int): The number of plies to expand.
+        stats (SearchStats, optional): Statistics to count interior nodes into.
+            Defaults to None.
+
+    Returns:
+        int: The number of positions reached after depth plies.
+    """
+    if depth == 0:
+        return 1
+    if stats is not None:
+        stats.nodes += 1
+    moves = gs.getValidMoves()
+    if depth == 1:
+        return len(moves)
+    leaves = 0
+    for move in moves:
+        gs.makeMove(move)
+        leaves += perft(gs, depth - 1, stats)
+        gs.undoMove()
+    return leaves
+
+
+def runPerft(gs, depth: int, timing: bool = True) -> SearchStats:
+    """Run perft for every depth up to `depth` and collect its statistics.
+
+    The leaf counts of each depth are kept in `iterationNodes`, so their ratio
+    is the branching factor of the position.
+    """
+    stats = SearchStats()
+    if timing:
+        with phaseTimers(stats):
+            _perftIterations(gs, depth, stats)
+    else:
+        _perftIterations(gs, depth, stats)
+    stats.finish()
+    return stats
+
+
+def _perftIterations(gs, depth: int, stats: SearchStats):
+    for d in range(1, depth + 1):
+        stats.iterationNodes.append(perft(gs, d, stats))
+        stats.depth = d
+
+
+def main():
+    import argparse
+    from board import BoardState
+    from engine import Engine
+    from pgn import findMove
+    from timemanager import TimeManager
+
+    parser = argparse.ArgumentParser(description="Report search or perft statistics.")
+    parser.add_argument("mode", choices=["search", "perft"])
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--movetime", type=float, help="search time in seconds")
+    parser.add_argument("--moves", default="", help="coordinate moves to play first, e.g. e2e4,e7e5")
+    parser.add_argument("--no-timing", action="store_true", help="skip the per-phase timers")
+    parser.add_argument("--profile", action="store_true", help="print a cProfile report")
+    parser.add_argument("--json", help="write the statistics to this file")
+    args = parser.parse_args()
+
+    gs = BoardState()
+    for text in filter(None, args.moves.split(",")):
+        gs.makeMove(findMove(gs, text))
+
+    if args.mode == "perft":
+        run = lambda: runPerft(gs, args.depth, not args.no_timing)
+    else:
+        engine = Engine(timing=not args.no_timing)
+        timeManager = TimeManager.fixed(args.movetime) if args.movetime else None
+        run = lambda: engine.search(gs, timeManager, args.depth).stats
+    if args.profile:
+        stats, report = profiled(run)
+        print(report)
+    else:
+        stats = run()
+    print(stats.toJson(args.json))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+
+class Client:
+    """A connection to a `GameServer` that matches replies to requests by id."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._nextId = 0
+        self._waiting = {}
+        self._closed = False
+        self._readerTask = asyncio.create_task(self._readReplies())
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> Client:
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        return cls(reader, writer)
+
+    async def request(self, **request) -> dict:
+        if self._closed:
+            raise ConnectionError("The server closed the connection")
+        self._nextId += 1
+        request["id"] = self._nextId
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[self._nextId] = future
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def _readReplies(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                reply = json.loads(line)
+                future = self._waiting.pop(reply.get("id"), None)
+                if future is not None:
+                    future.set_result(reply)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            # Fail the requests still waiting so a dropped connection cannot
+            # hang the generator.
+            self._closed = True
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("The server closed the connection"))
+            self._waiting.clear()
+
+    async def close(self):
+        self._readerTask.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def playGames(
+    host: str,
+    port: int,
+    games: int,
+    plies: int,
+    goEvery: int,
+    movetime: float,
+    latencies: dict,
+    pipeline: int = 1,
+):
+    """Play random games on one connection, recording the latency of each command.
+
+    `pipeline` games are played at once over the connection, so up to that many
+    requests are in flight on it; set it above the server's `maxInFlight` to
+    exercise its backpressure.
+    """
+    client = await Client.connect(host, port)
+    try:
+        await asyncio.gather(
+            *(
+                _playGames(client, games, plies, goEvery, movetime, latencies)
+                for _ in range(pipeline)
+            )
+        )
+    finally:
+        await client.close()
+
+
+async def _playGames(
+    client: Client, games: int, plies: int, goEvery: int, movetime: float, latencies: dict
+):
+    for _ in range(games):
+        start = time.perf_counter()
+        state = await client.request(cmd="new")
+        latencies["new"].append(time.perf_counter() - start)
+        session = state["session"]
+        for ply in range(plies):
+            if state.get("status") != "playing":
+                break
+            start = time.perf_counter()
+            if goEvery and ply % goEvery == goEvery - 1:
+                state = await client.request(cmd="go", session=session, movetime=movetime)
+                latencies["go"].append(time.perf_counter() - start)
+            else:
+                move = random.choice(state["legalMoves"])
+                state = await client.request(cmd="move", session=session, move=move)
+                latencies["move"].append(time.perf_counter() - start)
+            if "error" in state:
+                raise RuntimeError(state["error"])
+        await client.request(cmd="close", session=session)
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run(args):
+    latencies = {"new": [], "move": [], "go": []}
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            playGames(
+                args.host,
+                args.port,
+                args.games,
+                args.plies,
+                args.go_every,
+                args.movetime,
+                latencies,
+                args.pipeline,
+            )
+            for _ in range(args.connections)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s)")
+    for command, samples in latencies.items():
+        if samples:
+            print(
+                f"{command:>5}: n={len(samples)} "
+                f"mean={statistics.mean(samples) * 1000:.1f}ms "
+                f"p50={percentile(samples, 0.5) * 1000:.1f}ms "
+                f"p95={percentile(samples, 0.95) * 1000:.1f}ms "
+                f"p99={percentile(samples, 0.99) * 1000:.1f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate load against server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--connections", type=int, default=50)
+    parser.add_argument("--games", type=int, default=2, help="games per pipelined stream")
+    parser.add_argument(
+        "--pipeline", type=int, default=1, help="games played at once, and so requests in flight, per connection"
+    )
+    parser.add_argument("--plies", type=int, default=40, help="plies per game")
+    parser.add_argument("--go-every", type=int, default=10, help="ask the engine every N plies (0 never)")
+    parser.add_argument("--movetime", type=float, default=0.2)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
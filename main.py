@@ -1,14 +1,44 @@
 from const import *
 import pygame as pg
+import threading
 from board import BoardState, Move
 from const import HEIGHT, WIDTH, MOVELOG_WIDTH
+from engine import Engine
+from renderer import BoardRenderer, MoveLogRenderer
+from timemanager import TimeManager
 import sys
 
+# Whether a human plays white (playerOne) and black (playerTwo); the engine
+# plays the other side(s).
+playerOne = True
+playerTwo = False
+ENGINE_THINK_TIME = 1.0
+ANIMATION_FRAME_MS = 1000 // 60
+
+ENGINE_MOVE = pg.event.custom_type()
+
+
+def startEngine(engine: Engine, gameState: BoardState, generation: int) -> threading.Thread:
+    """Search the current position in a background thread.
+
+    The search runs on a copy of the position so the UI can keep drawing the real
+    board. The result is posted as an ENGINE_MOVE event tagged with the
+    generation of the game it was computed for.
+    """
+    position = gameState.copy(withHistory=True)
+
+    def run():
+        result = engine.search(position, TimeManager.fixed(ENGINE_THINK_TIME))
+        pg.event.post(pg.event.Event(ENGINE_MOVE, result=result, generation=generation))
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
 
 def main():
     pg.init()
     screen = pg.display.set_mode((WIDTH + MOVELOG_WIDTH, HEIGHT))
-    clock = pg.time.Clock()
     screen.fill(pg.Color("white"))
     gameState = BoardState()
     validMoves = gameState.getValidMoves()
@@ -18,19 +48,79 @@ def main():
     sqSelected = ()
     playerClicks = []
     gameOver = False
-    moveUndone = False
+    pendingPromotion = None
     moveLogFont = pg.font.SysFont("Arial", 14, False, False)
-    
+    renderer = BoardRenderer()
+    moveLogRenderer = MoveLogRenderer(pg.Rect(WIDTH, 0, MOVELOG_WIDTH, HEIGHT), moveLogFont)
+    engine = Engine()
+    engineThread = None
+    # Bumped on undo and reset so that results of abandoned searches are dropped.
+    generation = 0
+    pg.display.flip()
+
     while running:
-        for e in pg.event.get():
+        humanTurn = (gameState.whiteMove and playerOne) or (
+            not gameState.whiteMove and playerTwo
+        )
+        if not gameOver and not humanTurn and engineThread is None:
+            engineThread = startEngine(engine, gameState, generation)
+
+        dirtyRects = renderer.draw(screen, gameState, validMoves, sqSelected)
+        if pendingPromotion is not None and dirtyRects:
+            dirtyRects.append(renderer.drawPromotionChooser(screen, pendingPromotion))
+
+        moveLogRect = moveLogRenderer.draw(screen, gameState.moveLog)
+        if moveLogRect:
+            dirtyRects.append(moveLogRect)
+
+        endGameText = None
+        if gameState.checkmate:
+            gameOver = True
+            endGameText = "{} wins by checkmate".format(
+                "Black" if gameState.whiteMove else "White"
+            )
+        elif gameState.stalemate:
+            gameOver = True
+            endGameText = "Stalemate"
+        # Squares repainted under the text would otherwise cover it.
+        if endGameText and dirtyRects and not renderer.animating:
+            dirtyRects.append(gameState.drawEndGameText(screen, endGameText))
+        pg.display.update(dirtyRects)
+
+        # Sleep until there is input or an engine move, waking up only for
+        # animation frames.
+        events = [pg.event.wait(ANIMATION_FRAME_MS if renderer.animating else 0)]
+        events += pg.event.get()
+        for e in events:
             if e.type == pg.QUIT:
+                engine.stop()
                 pg.quit()
                 sys.exit()
-            elif e.type == pg.MOUSEBUTTONDOWN:
-                if not gameOver:
+            elif e.type == ENGINE_MOVE:
+                if e.generation == generation:
+                    engineThread = None
+                    for move in validMoves:
+                        if move == e.result.bestMove:
+                            move.promotionPiece = e.result.bestMove.promotionPiece
+                            gameState.makeMove(move)
+                            moveMade = True
+                            animate = True
+                            break
+            elif e.type == pg.MOUSEBUTTONDOWN and e.button in (1, 3):
+                if not gameOver and humanTurn and not moveMade:
                     location = pg.mouse.get_pos()
                     col = location[0] // SQSIZE
                     row = location[1] // SQSIZE
+                    if pendingPromotion is not None:
+                        piece = renderer.promotionChoice(pendingPromotion, (row, col))
+                        if piece:
+                            pendingPromotion.promotionPiece = piece
+                            gameState.makeMove(pendingPromotion)
+                            moveMade = True
+                            animate = True
+                        pendingPromotion = None
+                        renderer.invalidate()
+                        continue
                     if sqSelected == (row, col) or col >= 8:
                         sqSelected = ()
                         playerClicks = []
@@ -41,58 +131,60 @@ def main():
                         move = Move(*playerClicks, gameState.board)
                         for i in range(len(validMoves)):
                             if move == validMoves[i]:
-                                gameState.makeMove(validMoves[i])
-                                moveMade = True
-                                animate = True
+                                if validMoves[i].isPawnPromotion:
+                                    pendingPromotion = validMoves[i]
+                                else:
+                                    gameState.makeMove(validMoves[i])
+                                    moveMade = True
+                                    animate = True
                                 sqSelected = ()
                                 playerClicks = []
-                        if not moveMade:
+                                break
+                        if not moveMade and pendingPromotion is None:
                             playerClicks = [sqSelected]
 
+            elif e.type == pg.MOUSEWHEEL:
+                if moveLogRenderer.rect.collidepoint(pg.mouse.get_pos()):
+                    # Wheel up goes back towards the first move.
+                    moveLogRenderer.scroll(-e.y)
+
             elif e.type == pg.KEYDOWN:
+                if e.key in (pg.K_z, pg.K_r):
+                    engine.stop()
+                    if engineThread is not None:
+                        engineThread.join()
+                        engineThread = None
+                    generation += 1
+                    pendingPromotion = None
+                    sqSelected = ()
+                    playerClicks = []
+                    gameOver = False
+                    renderer.invalidate()
+
                 if e.key == pg.K_z:
-                    gameState.undoMove()
+                    if gameState.moveLog:
+                        gameState.undoMove()
+                    # Take back the engine's reply too, so it is the human's turn again.
+                    humanTurn = (gameState.whiteMove and playerOne) or (
+                        not gameState.whiteMove and playerTwo
+                    )
+                    if not humanTurn and gameState.moveLog:
+                        gameState.undoMove()
                     moveMade = True
                     animate = False
-                    gameOver = False
-                    moveUndone = True
 
                 if e.key == pg.K_r:
                     gameState = BoardState()
                     validMoves = gameState.getValidMoves()
-                    sqSelected = ()
-                    playerClicks = []
                     moveMade = False
                     animate = False
-                    gameOver = False
-                    moveUndone = True
 
         if moveMade:
             if animate:
-                gameState.animateMove(screen, clock)
+                renderer.startAnimation(gameState.moveLog[-1])
             validMoves = gameState.getValidMoves()
             moveMade = False
             animate = False
-            moveUndone = False
-
-        gameState.drawBoardState(screen, validMoves, sqSelected)
-        
-        if not gameOver:
-            gameState.drawMoveLog(screen, moveLogFont)
-            
-        if gameState.checkmate:
-            gameOver = True
-            gameState.drawEndGameText(
-                screen,
-                "{} wins by checkmate".format(
-                    "Black" if gameState.whiteMove else "White"
-                ),
-            )
-        elif gameState.stalemate:
-            gameState.drawEndGameText(screen, "Stalemate")
-            
-        clock.tick(MAX_FPS)
-        pg.display.flip()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+from __future__ import annotations
+import re
+from typing import Iterator
+from board import BoardState, Move
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+_headerRe = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+_sanRe = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+_moveNumberRe = re.compile(r"^\d+\.+")
+
+
+def readGames(path: str) -> Iterator[tuple[dict[str, str], list[str]]]:
+    """Read the games of a PGN file one at a time.
+
+    Comments, recursive variations and numeric annotation glyphs are skipped.
+
+    Args:
+        path (str): The path of the PGN file.
+
+    Yields:
+        tuple[dict[str, str], list[str]]: The headers and the SAN moves of a game.
+    """
+    headers = {}
+    movetext = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            match = _headerRe.match(line)
+            if match:
+                if movetext:
+                    yield headers, _sanTokens(" ".join(movetext))
+                    headers, movetext = {}, []
+                headers[match.group(1)] = match.group(2)
+            elif line and not line.startswith("%"):
+                movetext.append(line)
+    if headers or movetext:
+        yield headers, _sanTokens(" ".join(movetext))
+
+
+def _sanTokens(movetext: str) -> list[str]:
+    """Split a PGN movetext section into its SAN moves."""
+    text = re.sub(r"\{[^}]*\}|;[^\n]*", " ", movetext)
+    depth = 0
+    stripped = []
+    for char in text:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0:
+            stripped.append(char)
+
+    tokens = []
+    for token in "".join(stripped).split():
+        token = _moveNumberRe.sub("", token)
+        if not token or token in RESULTS or token.startswith("$"):
+            continue
+        tokens.append(token)
+    return tokens
+
+
+def parseSan(gs: BoardState, san: str, validMoves: list[Move] = None) -> Move:
+    """Find the legal move described by a SAN string in the given position.
+
+    Args:
+        gs (BoardState): The position the move is played in.
+        san (str): The move in Standard Algebraic Notation, e.g. "Nbd7" or "exd8=Q+".
+        validMoves (list[Move], optional): The legal moves of the position, if
+            already generated. Defaults to None.
+
+    Raises:
+        ValueError: If the string does not describe exactly one legal move.
+
+    Returns:
+        Move: The matching move, with its promotion piece set.
+    """
+    if validMoves is None:
+        validMoves = gs.getValidMoves()
+    token = san.rstrip("+#!?")
+
+    if token in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        endCol = 6 if len(token) == 3 else 2
+        for move in validMoves:
+            if move.isCastleMove and move.endSqCol == endCol:
+                return move
+        raise ValueError(f"Illegal castling move {san!r}")
+
+    match = _sanRe.match(token)
+    if not match:
+        raise ValueError(f"Unrecognised SAN move {san!r}")
+    piece, fromFile, fromRank, toSquare, promotion = match.groups()
+    piece = piece or "p"
+    endRow = Move.ranksToRows[toSquare[1]]
+    endCol = Move.filesToCols[toSquare[0]]
+
+    candidates = [
+        move
+        for move in validMoves
+        if move.movedPiece[1] == piece
+        and not move.isCastleMove
+        and move.endSqRow == endRow
+        and move.endSqCol == endCol
+        and (fromFile is None or move.startSqCol == Move.filesToCols[fromFile])
+        and (fromRank is None or move.startSqRow == Move.ranksToRows[fromRank])
+    ]
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move {san!r}")
+
+    move = candidates[0]
+    if move.isPawnPromotion:
+        move.promotionPiece = promotion or "Q"
+    return move
+
+
+def findMove(gs: BoardState, text: str, validMoves: list[Move] = None) -> Move:
+    """Find the legal move written in coordinate notation.
+
+    Args:
+        gs (BoardState): The position the move is played in.
+        text (str): The move, e.g. "g1f3" or "a7a8n".
+        validMoves (list[Move], optional): The legal moves of the position, if
+            already generated. Defaults to None.
+
+    Raises:
+        ValueError: If the text is not a legal move of the position.
+
+    Returns:
+        Move: The matching move, with its promotion piece set.
+    """
+    if validMoves is None:
+        validMoves = gs.getValidMoves()
+    text = text.strip()
+    if len(text) not in (4, 5) or text[:4] != text[:4].lower():
+        raise ValueError(f"Malformed move {text!r}")
+    try:
+        startRow, startCol = Move.ranksToRows[text[1]], Move.filesToCols[text[0]]
+        endRow, endCol = Move.ranksToRows[text[3]], Move.filesToCols[text[2]]
+    except KeyError:
+        raise ValueError(f"Malformed move {text!r}") from None
+    for move in validMoves:
+        if (move.startSqRow, move.startSqCol, move.endSqRow, move.endSqCol) == (
+            startRow,
+            startCol,
+            endRow,
+            endCol,
+        ):
+            if move.isPawnPromotion:
+                piece = text[4:].upper() or "Q"
+                if piece not in "QRBN":
+                    raise ValueError(f"Invalid promotion in {text!r}")
+                move.promotionPiece = piece
+            return move
+    raise ValueError(f"Illegal move {text!r}")
+
+
+def moveToSan(gs: BoardState, move: Move, validMoves: list[Move] = None) -> str:
+    """Write a move in Standard Algebraic Notation.
+
+    Args:
+        gs (BoardState): The position before the move. It is restored on return.
+        move (Move): The move to write.
+        validMoves (list[Move], optional): The legal moves of the position, if
+            already generated. Defaults to None.
+
+    Returns:
+        str: The move in SAN, with check and mate suffixes.
+    """
+    if validMoves is None:
+        validMoves = gs.getValidMoves()
+    piece = move.movedPiece[1]
+    endSq = move.getRankFile(move.endSqRow, move.endSqCol)
+
+    if move.isCastleMove:
+        san = "O-O" if move.endSqCol == 6 else "O-O-O"
+    elif piece == "p":
+        san = endSq
+        if move.is_capture:
+            san = Move.ColsToFiles[move.startSqCol] + "x" + endSq
+        if move.isPawnPromotion:
+            san += "=" + (move.promotionPiece or "Q")
+    else:
+        rivals = [
+            other
+            for other in validMoves
+            if other.movedPiece == move.movedPiece
+            and other.endSqRow == move.endSqRow
+            and other.endSqCol == move.endSqCol
+            and other != move
+        ]
+        disambiguation = ""
+        if rivals:
+            if all(other.startSqCol != move.startSqCol for other in rivals):
+                disambiguation = Move.ColsToFiles[move.startSqCol]
+            elif all(other.startSqRow != move.startSqRow for other in rivals):
+                disambiguation = Move.RowsToRanks[move.startSqRow]
+            else:
+                disambiguation = move.getRankFile(move.startSqRow, move.startSqCol)
+        san = piece + disambiguation + ("x" if move.is_capture else "") + endSq
+
+    gs.makeMove(move)
+    gs.getValidMoves()
+    if gs.checkmate:
+        san += "#"
+    elif gs.inCheck:
+        san += "+"
+    gs.undoMove()
+    return san
+
+
+def writeGame(f, headers: dict[str, str], sanMoves: list[str], result: str):
+    """Write a game in PGN export format.
+
+    Args:
+        f: The text file to write to.
+        headers (dict[str, str]): The tag pairs of the game, in order.
+        sanMoves (list[str]): The moves of the game in SAN.
+        result (str): The game result, one of RESULTS.
+    """
+    for name, value in {**headers, "Result": result}.items():
+        f.write(f'[{name} "{value}"]\n')
+    f.write("\n")
+    tokens = []
+    for ply, san in enumerate(sanMoves):
+        if ply % 2 == 0:
+            tokens.append(f"{ply // 2 + 1}.")
+        tokens.append(san)
+    tokens.append(result)
+    line = ""
+    for token in tokens:
+        if len(line) + len(token) + 1 > 80:
+            f.write(line + "\n")
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    f.write(line + "\n\n")
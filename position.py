@@ -0,0 +1,360 @@
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+import struct
+import numpy as np
+from board import BoardState, CastleRights
+
+# Packed position layout (32 bytes, big endian):
+#   occupancy  8  bit row * 8 + col is set for every occupied square
+#   pieces    16  a 4-bit piece code per occupied square, in square order
+#   flags      1  bit 0 white to move, bits 1-4 castling rights wks, wqs, bks, bqs
+#   epFile     1  the en passant file + 1, or 0
+#   halfmove   1  plies since the last capture or pawn move, capped at 255
+#   fullmove   2  the full move number
+#   padding    3
+POSITION = struct.Struct(">Q16sBBBH3x")
+POSITION_DTYPE = np.dtype(
+    [
+        ("occupancy", ">u8"),
+        ("pieces", "u1", 16),
+        ("flags", "u1"),
+        ("epFile", "u1"),
+        ("halfmove", "u1"),
+        ("fullmove", ">u2"),
+        ("padding", "V3"),
+    ]
+)
+# The bytes that identify a position; the clocks are left out.
+POSITION_KEY_SIZE = 26
+
+PIECE_CODES = {
+    piece: code
+    for code, piece in enumerate(
+        ["wp", "wN", "wB", "wR", "wQ", "wK", "bp", "bN", "bB", "bR", "bQ", "bK"]
+    )
+}
+CODE_PIECES = {code: piece for piece, code in PIECE_CODES.items()}
+
+
+def _clocks(gs: BoardState) -> tuple[int, int]:
+    halfmove = 0
+    for move in reversed(gs.moveLog):
+        if move.movedPiece[1] == "p" or move.is_capture:
+            break
+        halfmove += 1
+    return halfmove, len(gs.moveLog) // 2 + 1
+
+
+def encodePosition(
+    gs: BoardState, halfmoveClock: int = None, fullmoveNumber: int = None
+) -> bytes:
+    """Pack a position into its 32-byte record.
+
+    Args:
+        gs (BoardState): The position to pack.
+        halfmoveClock (int, optional): The plies since the last capture or pawn
+            move. Defaults to None, counting them from the move log.
+        fullmoveNumber (int, optional): The full move number. Defaults to None,
+            counting it from the move log.
+
+    Returns:
+        bytes: The packed position.
+    """
+    if halfmoveClock is None or fullmoveNumber is None:
+        halfmove, fullmove = _clocks(gs)
+        halfmoveClock = halfmove if halfmoveClock is None else halfmoveClock
+        fullmoveNumber = fullmove if fullmoveNumber is None else fullmoveNumber
+
+    occupancy = 0
+    codes = []
+    for sq, piece in enumerate(gs.board.ravel().tolist()):
+        if piece != "--":
+            occupancy |= 1 << sq
+            codes.append(PIECE_CODES[piece])
+    if len(codes) & 1:
+        codes.append(0)
+    pieces = bytes(codes[i] << 4 | codes[i + 1] for i in range(0, len(codes), 2))
+
+    rights = gs.currentCastlingRights
+    flags = (
+        gs.whiteMove
+        | rights.wks << 1
+        | rights.wqs << 2
+        | rights.bks << 3
+        | rights.bqs << 4
+    )
+    epFile = gs.enpassantPossible[1] + 1 if gs.enpassantPossible else 0
+    return POSITION.pack(
+        occupancy,
+        pieces,
+        flags,
+        epFile,
+        min(halfmoveClock, 255),
+        min(fullmoveNumber, 0xFFFF),
+    )
+
+
+def decodePosition(data) -> BoardState:
+    """Unpack a 32-byte record into a board with an empty move log.
+
+    Args:
+        data (bytes): The packed position, or any buffer starting with one.
+
+    Returns:
+        BoardState: The position. Use `decodeClocks` for its move counters.
+    """
+    occupancy, pieces, flags, epFile, _, _ = POSITION.unpack_from(data)
+    board = ["--"] * 64
+    sq = 0
+    for i in range(bin(occupancy).count("1")):
+        while not occupancy >> sq & 1:
+            sq += 1
+        code = pieces[i >> 1] >> 4 if i & 1 == 0 else pieces[i >> 1] & 15
+        board[sq] = CODE_PIECES[code]
+        sq += 1
+
+    gs = BoardState()
+    gs.board = np.array(board).reshape(8, 8)
+    gs.whiteMove = bool(flags & 1)
+    gs.whiteKingLocation = divmod(board.index("wK"), 8) if "wK" in board else ()
+    gs.blackKingLocation = divmod(board.index("bK"), 8) if "bK" in board else ()
+    gs.currentCastlingRights = CastleRights(
+        bool(flags & 2), bool(flags & 8), bool(flags & 4), bool(flags & 16)
+    )
+    gs.castleRightsLog = [
+        CastleRights(
+            gs.currentCastlingRights.wks,
+            gs.currentCastlingRights.bks,
+            gs.currentCastlingRights.wqs,
+            gs.currentCastlingRights.bqs,
+        )
+    ]
+    gs.enpassantPossible = ((2 if gs.whiteMove else 5), epFile - 1) if epFile else ()
+    gs.enpassantPossibleLogs = [gs.enpassantPossible]
+    return gs
+
+
+def decodeClocks(data) -> tuple[int, int]:
+    """The halfmove clock and full move number of a packed position."""
+    return POSITION.unpack_from(data)[4:6]
+
+
+def positionHash(data) -> int:
+    """A 64-bit hash of a packed position, ignoring its clocks."""
+    digest = hashlib.blake2b(bytes(data[:POSITION_KEY_SIZE]), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+# Index file layout: a header of capacity and indexed record count, then
+# open-addressed slots of (position hash, record number + 1), 0 marking an
+# empty slot.
+INDEX_HEADER = struct.Struct(">QQ")
+INDEX_SLOT = struct.Struct(">QQ")
+MIN_INDEX_CAPACITY = 1 << 10
+
+
+class PositionStore:
+    """An append-only file of packed positions with a hash index.
+
+    Records are appended to `path` and never rewritten, so readers can map the
+    file and read them without copying; `records` returns them as a NumPy
+    structured array over the mapping. The index in `path + ".idx"` maps each
+    distinct position (ignoring clocks) to its first record. It is rebuilt from
+    the records if it is missing or behind, e.g. after a crash between the two
+    writes, and a partly written last record is cut off when the store is
+    opened for writing.
+
+    Example:
+        with PositionStore("positions.bin") as store:
+            number = store.add(gs)
+            assert store.find(gs) == number
+    """
+
+    def __init__(self, path: str, readOnly: bool = False):
+        self.path = path
+        self.readOnly = readOnly
+        if not readOnly and not os.path.exists(path):
+            open(path, "wb").close()
+        self._file = open(path, "rb" if readOnly else "r+b")
+        self._file.seek(0, os.SEEK_END)
+        self._count = self._file.tell() // POSITION.size
+        if not readOnly:
+            self._file.truncate(self._count * POSITION.size)
+        self._records = None
+        self._index = None
+        self._indexFile = None
+        self._capacity = 0
+        self._openIndex()
+
+    def close(self):
+        """Unmap and close the record and index files."""
+        self._unmapRecords()
+        if self._index is not None:
+            self._index.close()
+            self._indexFile.close()
+            self._index = None
+        self._file.close()
+
+    def __enter__(self) -> PositionStore:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _unmapRecords(self):
+        # Dropped rather than closed: views handed out by `record` and
+        # `records` keep an old mapping alive until they are released.
+        self._records = None
+
+    def _mapRecords(self, size: int):
+        """Map the record file, remapping it only if the mapping is shorter than size."""
+        if self._records is None or len(self._records) < size:
+            self._unmapRecords()
+            self._file.flush()
+            self._records = (
+                mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self._count
+                else b""
+            )
+        return self._records
+
+    def record(self, number: int) -> memoryview:
+        """Return the packed bytes of a record without copying them.
+
+        Args:
+            number (int): The record number, in insertion order.
+
+        Raises:
+            IndexError: If there is no such record.
+
+        Returns:
+            memoryview: The 32-byte record.
+        """
+        if not 0 <= number < self._count:
+            raise IndexError(f"No record {number}")
+        start = number * POSITION.size
+        return memoryview(self._mapRecords(start + POSITION.size))[start : start + POSITION.size]
+
+    def records(self) -> np.ndarray:
+        """Return every record as a read-only structured array over the mapped file."""
+        return np.frombuffer(
+            self._mapRecords(self._count * POSITION.size),
+            dtype=POSITION_DTYPE,
+            count=self._count,
+        )
+
+    def getPosition(self, number: int) -> BoardState:
+        return decodePosition(self.record(number))
+
+    def _openIndex(self):
+        indexPath = self.path + ".idx"
+        if not os.path.exists(indexPath):
+            if self.readOnly:
+                raise FileNotFoundError(f"No index for {self.path}")
+            self._createIndex(MIN_INDEX_CAPACITY)
+        else:
+            self._indexFile = open(indexPath, "rb" if self.readOnly else "r+b")
+            access = mmap.ACCESS_READ if self.readOnly else mmap.ACCESS_WRITE
+            self._index = mmap.mmap(self._indexFile.fileno(), 0, access=access)
+            self._capacity = INDEX_HEADER.unpack_from(self._index)[0]
+        indexed = INDEX_HEADER.unpack_from(self._index)[1]
+        if indexed < self._count:
+            if self.readOnly:
+                raise ValueError(f"The index of {self.path} is behind its records")
+            for number in range(indexed, self._count):
+                self._insert(positionHash(self.record(number)), number)
+
+    def _createIndex(self, capacity: int):
+        indexPath = self.path + ".idx"
+        tmpPath = indexPath + ".tmp"
+        with open(tmpPath, "wb") as f:
+            f.truncate(INDEX_HEADER.size + capacity * INDEX_SLOT.size)
+        if self._index is not None:
+            self._index.close()
+            self._indexFile.close()
+        os.replace(tmpPath, indexPath)
+        self._indexFile = open(indexPath, "r+b")
+        self._index = mmap.mmap(self._indexFile.fileno(), 0, access=mmap.ACCESS_WRITE)
+        self._capacity = capacity
+        INDEX_HEADER.pack_into(self._index, 0, capacity, 0)
+
+    def _grow(self):
+        """Double the index, reinserting the slots of the old one."""
+        old = self._index[INDEX_HEADER.size :]
+        indexed = INDEX_HEADER.unpack_from(self._index)[1]
+        self._createIndex(self._capacity * 2)
+        for offset in range(0, len(old), INDEX_SLOT.size):
+            key, slotValue = INDEX_SLOT.unpack_from(old, offset)
+            if slotValue:
+                self._place(key, slotValue)
+        INDEX_HEADER.pack_into(self._index, 0, self._capacity, indexed)
+
+    def _place(self, key: int, slotValue: int):
+        mask = self._capacity - 1
+        slot = key & mask
+        while INDEX_SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * INDEX_SLOT.size)[1]:
+            slot = (slot + 1) & mask
+        offset = INDEX_HEADER.size + slot * INDEX_SLOT.size
+        INDEX_SLOT.pack_into(self._index, offset, key, slotValue)
+
+    def _insert(self, key: int, number: int, unique: bool = False):
+        """Index a record unless an equal position is already indexed."""
+        if unique or self._lookup(key, self.record(number)) is None:
+            indexed = INDEX_HEADER.unpack_from(self._index)[1]
+            if 2 * (indexed + 1) > self._capacity:
+                self._grow()
+            self._place(key, number + 1)
+        INDEX_HEADER.pack_into(self._index, 0, self._capacity, number + 1)
+
+    def _lookup(self, key: int, data) -> int:
+        """Find the record of a packed position, comparing bytes to rule out hash collisions."""
+        mask = self._capacity - 1
+        slot = key & mask
+        target = bytes(data[:POSITION_KEY_SIZE])
+        while True:
+            slotKey, slotValue = INDEX_SLOT.unpack_from(
+                self._index, INDEX_HEADER.size + slot * INDEX_SLOT.size
+            )
+            if not slotValue:
+                return None
+            if slotKey == key and self.record(slotValue - 1)[:POSITION_KEY_SIZE] == target:
+                return slotValue - 1
+            slot = (slot + 1) & mask
+
+    def find(self, gs: BoardState) -> int:
+        """Return the record number of a position, or None if it is not stored."""
+        data = encodePosition(gs, 0, 1)
+        return self._lookup(positionHash(data), data)
+
+    def add(self, gs: BoardState, halfmoveClock: int = None, fullmoveNumber: int = None) -> int:
+        """Store a position unless it is already stored.
+
+        Args:
+            gs (BoardState): The position to store.
+            halfmoveClock (int, optional): See `encodePosition`. Defaults to None.
+            fullmoveNumber (int, optional): See `encodePosition`. Defaults to None.
+
+        Returns:
+            int: The number of the position's record.
+        """
+        return self.addPacked(encodePosition(gs, halfmoveClock, fullmoveNumber))
+
+    def addPacked(self, data: bytes) -> int:
+        """Store a packed position unless it is already stored, returning its record number."""
+        if self.readOnly:
+            raise ValueError(f"{self.path} is open read-only")
+        key = positionHash(data)
+        number = self._lookup(key, data)
+        if number is not None:
+            return number
+        self._file.seek(self._count * POSITION.size)
+        self._file.write(data)
+        number = self._count
+        self._count += 1
+        self._insert(key, number, unique=True)
+        return number
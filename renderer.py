@@ -0,0 +1,313 @@
+from __future__ import annotations
+import time
+import pygame as pg
+from board import BoardState, Move
+from const import COLS, ROWS, SQSIZE, pieceImages
+
+HIGHLIGHT_ALPHA = 100
+SECONDS_PER_SQUARE = 1 / 6
+PROMOTION_PIECES = ["Q", "R", "B", "N"]
+
+
+class BoardRenderer:
+    """Draw a board by repainting only the squares that changed.
+
+    The empty board is rendered once and the translucent highlight overlays are
+    created once per colour. Every frame the renderer works out what each square
+    should show (piece and highlight) and repaints only the squares that differ
+    from the last frame, returning their rectangles for `pg.display.update`.
+    """
+
+    def __init__(self, lightColor: str = "white", darkColor: str = "gray", style: str = "classic"):
+        self.images = pieceImages(style)
+        self.colors = [pg.Color(lightColor), pg.Color(darkColor)]
+        self.boardSurface = pg.Surface((COLS * SQSIZE, ROWS * SQSIZE))
+        for r in range(ROWS):
+            for c in range(COLS):
+                pg.draw.rect(
+                    self.boardSurface,
+                    self.colors[(r + c) % 2],
+                    pg.Rect(c * SQSIZE, r * SQSIZE, SQSIZE, SQSIZE),
+                )
+        self._overlays = {}
+        self._drawn = None
+        self._animation = None
+
+    def overlay(self, color: str) -> pg.Surface:
+        """Return the cached translucent square of a highlight colour."""
+        if color not in self._overlays:
+            s = pg.Surface((SQSIZE, SQSIZE))
+            s.set_alpha(HIGHLIGHT_ALPHA)
+            s.fill(pg.Color(color))
+            self._overlays[color] = s
+        return self._overlays[color]
+
+    def invalidate(self):
+        """Force the next frame to repaint every square."""
+        self._drawn = None
+
+    @property
+    def animating(self) -> bool:
+        return self._animation is not None
+
+    def startAnimation(self, move: Move):
+        """Slide the piece of a move that was just made over the next frames.
+
+        Args:
+            move (Move): The last move of the game.
+        """
+        squares = abs(move.endSqRow - move.startSqRow) + abs(move.endSqCol - move.startSqCol)
+        self._animation = (move, time.perf_counter(), squares * SECONDS_PER_SQUARE)
+
+    def squareStates(
+        self, gs: BoardState, validMoves: list[Move], sqSelected: tuple[int, int]
+    ) -> list[list[tuple[str, tuple[str, ...]]]]:
+        """Work out the piece and highlight colours each square should show.
+
+        Args:
+            gs (BoardState): The game to draw.
+            validMoves (list[Move]): The legal moves of the position.
+            sqSelected (tuple[int, int]): The selected square, or an empty tuple.
+
+        Returns:
+            list[list[tuple[str, tuple[str, ...]]]]: The piece and overlay colours
+                of each square, by row and column.
+        """
+        highlights = [[() for _ in range(COLS)] for _ in range(ROWS)]
+        if gs.moveLog:
+            lastMove = gs.moveLog[-1]
+            highlights[lastMove.endSqRow][lastMove.endSqCol] += ("green",)
+        if sqSelected:
+            row, col = sqSelected
+            if gs.board[row, col][0] == ("w" if gs.whiteMove else "b"):
+                highlights[row][col] += ("blue",)
+                for move in validMoves:
+                    if move.startSqRow == row and move.startSqCol == col:
+                        highlights[move.endSqRow][move.endSqCol] += ("yellow",)
+        board = gs.board.tolist()
+        return [[(board[r][c], highlights[r][c]) for c in range(COLS)] for r in range(ROWS)]
+
+    def draw(
+        self,
+        screen: pg.Surface,
+        gs: BoardState,
+        validMoves: list[Move],
+        sqSelected: tuple[int, int],
+    ) -> list[pg.Rect]:
+        """Repaint the squares that changed since the last frame.
+
+        Args:
+            screen (pg.Surface): The window surface.
+            gs (BoardState): The game to draw.
+            validMoves (list[Move]): The legal moves of the position.
+            sqSelected (tuple[int, int]): The selected square, or an empty tuple.
+
+        Returns:
+            list[pg.Rect]: The screen areas that were repainted.
+        """
+        if self._animation is not None:
+            dirty = self._drawAnimation(screen, gs)
+            if dirty:
+                return dirty
+        states = self.squareStates(gs, validMoves, sqSelected)
+        if self._drawn is None:
+            screen.blit(self.boardSurface, (0, 0))
+        dirty = []
+        for r in range(ROWS):
+            for c in range(COLS):
+                state = states[r][c]
+                if self._drawn is not None and self._drawn[r][c] == state:
+                    continue
+                rect = pg.Rect(c * SQSIZE, r * SQSIZE, SQSIZE, SQSIZE)
+                self.drawSquare(screen, rect, *state)
+                dirty.append(rect)
+        if self._drawn is None:
+            dirty = [pg.Rect(0, 0, COLS * SQSIZE, ROWS * SQSIZE)]
+        self._drawn = states
+        return dirty
+
+    def _drawAnimation(self, screen: pg.Surface, gs: BoardState) -> list[pg.Rect]:
+        """Draw the current frame of the running animation.
+
+        Returns:
+            list[pg.Rect]: The repainted area, or an empty list once the animation
+                is over and the squares it covered have been marked for repainting.
+        """
+        move, startTime, duration = self._animation
+        top, bottom = sorted((move.startSqRow, move.endSqRow))
+        left, right = sorted((move.startSqCol, move.endSqCol))
+        if move.isCastleMove:
+            # The rook jumps from its corner to the far side of the king.
+            rookCol = 7 if move.endSqCol > move.startSqCol else 0
+            left, right = min(left, rookCol), max(right, rookCol)
+        progress = (time.perf_counter() - startTime) / duration if duration else 1.0
+        if progress >= 1.0 or not gs.moveLog or gs.moveLog[-1] is not move:
+            self._animation = None
+            if self._drawn is not None:
+                for r in range(top, bottom + 1):
+                    for c in range(left, right + 1):
+                        self._drawn[r][c] = None
+            return []
+
+        board = gs.board.tolist()
+        board[move.endSqRow][move.endSqCol] = "--"
+        if move.isEnpassantMove:
+            board[move.startSqRow][move.endSqCol] = move.capturedPiece
+        else:
+            board[move.endSqRow][move.endSqCol] = move.capturedPiece
+        for r in range(top, bottom + 1):
+            for c in range(left, right + 1):
+                rect = pg.Rect(c * SQSIZE, r * SQSIZE, SQSIZE, SQSIZE)
+                self.drawSquare(screen, rect, board[r][c], ())
+        row = move.startSqRow + (move.endSqRow - move.startSqRow) * progress
+        col = move.startSqCol + (move.endSqCol - move.startSqCol) * progress
+        screen.blit(self.images[move.movedPiece], (col * SQSIZE, row * SQSIZE))
+        return [
+            pg.Rect(
+                left * SQSIZE,
+                top * SQSIZE,
+                (right - left + 1) * SQSIZE,
+                (bottom - top + 1) * SQSIZE,
+            )
+        ]
+
+    def promotionSquares(self, move: Move) -> list[tuple[int, int]]:
+        """The squares of the promotion chooser, queen first, running inwards from
+        the promotion square."""
+        direction = 1 if move.endSqRow == 0 else -1
+        return [(move.endSqRow + i * direction, move.endSqCol) for i in range(len(PROMOTION_PIECES))]
+
+    def drawPromotionChooser(self, screen: pg.Surface, move: Move) -> pg.Rect:
+        """Draw the pieces a pawn can promote to over the column it promotes on.
+
+        Args:
+            screen (pg.Surface): The window surface.
+            move (Move): The promotion move waiting for a piece.
+
+        Returns:
+            pg.Rect: The area covered by the chooser.
+        """
+        color = move.movedPiece[0]
+        rects = []
+        for (row, col), piece in zip(self.promotionSquares(move), PROMOTION_PIECES):
+            rect = pg.Rect(col * SQSIZE, row * SQSIZE, SQSIZE, SQSIZE)
+            pg.draw.rect(screen, self.colors[0], rect)
+            pg.draw.rect(screen, self.colors[1], rect, 2)
+            screen.blit(self.images[color + piece], rect)
+            rects.append(rect)
+        return rects[0].unionall(rects[1:])
+
+    def promotionChoice(self, move: Move, sq: tuple[int, int]) -> str:
+        """The piece picked by a click on sq in the chooser, or None if sq is outside it."""
+        for square, piece in zip(self.promotionSquares(move), PROMOTION_PIECES):
+            if square == sq:
+                return piece
+        return None
+
+    def drawSquare(self, screen: pg.Surface, rect: pg.Rect, piece: str, highlights: tuple[str, ...]):
+        screen.blit(self.boardSurface, rect, rect)
+        for color in highlights:
+            screen.blit(self.overlay(color), rect)
+        if piece != "--":
+            screen.blit(self.images[piece], rect)
+
+
+class MoveLogRenderer:
+    """Draw the move log panel from cached text lines.
+
+    Each line holds `movesPerRow` full moves and is rendered once; a new move
+    re-renders only the last line and `undoMove` only the lines it touched.
+    Only the lines that fit in the panel are blitted, and the panel follows
+    the latest move unless the user scrolled back through the game.
+    """
+
+    def __init__(
+        self,
+        rect: pg.Rect,
+        font: pg.font.Font,
+        movesPerRow: int = 3,
+        padding: int = 5,
+        lineSpacing: int = 2,
+    ):
+        self.rect = rect
+        self.font = font
+        self.movesPerRow = movesPerRow
+        self.padding = padding
+        self.lineHeight = font.get_linesize() + lineSpacing
+        self.visibleLines = max((rect.height - 2 * padding) // self.lineHeight, 1)
+        self.scrollOffset = 0  # lines scrolled back from the end of the log
+        self._moves = []
+        self._lines = []
+        self._dirty = True
+
+    def scroll(self, lines: int):
+        """Scroll the log, negative values going back towards the first move."""
+        maxOffset = max(len(self._lines) - self.visibleLines, 0)
+        offset = min(max(self.scrollOffset - lines, 0), maxOffset)
+        if offset != self.scrollOffset:
+            self.scrollOffset = offset
+            self._dirty = True
+
+    def update(self, moveLog: list[Move]) -> bool:
+        """Bring the cached lines in sync with the move log.
+
+        Moves are compared by identity from the end of the log, so the work
+        done is proportional to the number of moves made or undone since the
+        last call rather than to the length of the game.
+
+        Args:
+            moveLog (list[Move]): The moves of the game.
+
+        Returns:
+            bool: Whether any line changed.
+        """
+        common = min(len(self._moves), len(moveLog))
+        while common and self._moves[common - 1] is not moveLog[common - 1]:
+            common -= 1
+        if common == len(self._moves) == len(moveLog):
+            return False
+
+        pliesPerLine = 2 * self.movesPerRow
+        firstLine = common // pliesPerLine
+        lineCount = len(self._lines)
+        self._moves[common:] = moveLog[common:]
+        del self._lines[firstLine:]
+        for start in range(firstLine * pliesPerLine, len(self._moves), pliesPerLine):
+            self._lines.append(self._renderLine(start, self._moves[start : start + pliesPerLine]))
+        # Keep the lines a user scrolled back to in view as the game goes on.
+        if self.scrollOffset:
+            self.scrollOffset += len(self._lines) - lineCount
+        self.scroll(0)
+        self._dirty = True
+        return True
+
+    def _renderLine(self, start: int, moves: list[Move]) -> pg.Surface:
+        text = ""
+        for i in range(0, len(moves), 2):
+            text += str((start + i) // 2 + 1) + ". " + str(moves[i]) + " "
+            if i + 1 < len(moves):
+                text += str(moves[i + 1]) + " "
+        return self.font.render(text, True, pg.Color("white"))
+
+    def draw(self, screen: pg.Surface, moveLog: list[Move]) -> pg.Rect:
+        """Repaint the panel if the log or the scroll position changed.
+
+        Args:
+            screen (pg.Surface): The window surface.
+            moveLog (list[Move]): The moves of the game.
+
+        Returns:
+            pg.Rect: The panel area if it was repainted, otherwise None.
+        """
+        self.update(moveLog)
+        if not self._dirty:
+            return None
+        pg.draw.rect(screen, pg.Color("black"), self.rect)
+        end = len(self._lines) - self.scrollOffset
+        start = max(end - self.visibleLines, 0)
+        y = self.rect.top + self.padding
+        for line in self._lines[start:end]:
+            screen.blit(line, (self.rect.left + self.padding, y))
+            y += self.lineHeight
+        self._dirty = False
+        return self.rect
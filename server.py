@@ -0,0 +1,287 @@
+from __future__ import annotations
+import argparse
+import asyncio
+import itertools
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+from board import BoardState, Move
+from engine import Engine
+from pgn import findMove
+from position import decodePosition, encodePosition
+from sharedcache import SharedCache
+from timemanager import TimeManager
+
+MAX_LINE = 64 * 1024
+
+# One engine per worker process, so its transposition table is reused across
+# the searches that process serves.
+_workerEngine = None
+
+
+def _initWorker(cacheName: str):
+    """Create the worker's engine on the cache shared by all workers."""
+    global _workerEngine
+    sharedCache = SharedCache.attach(cacheName) if cacheName else None
+    _workerEngine = Engine(sharedCache=sharedCache)
+
+
+def moveToText(move: Move) -> str:
+    """Write a move in coordinate notation, e.g. "e2e4" or "e7e8q"."""
+    text = (
+        move.getRankFile(move.startSqRow, move.startSqCol)
+        + move.getRankFile(move.endSqRow, move.endSqCol)
+    )
+    if move.isPawnPromotion:
+        text += (move.promotionPiece or "Q").lower()
+    return text
+
+
+def searchPosition(position: bytes, movetime: float) -> dict:
+    """Search a game position in a worker process.
+
+    Args:
+        position (bytes): The position, packed by `encodePosition`.
+        movetime (float): The thinking time, in seconds.
+
+    Returns:
+        dict: The best move, score, depth and node count of the search.
+    """
+    gs = decodePosition(position)
+    result = _workerEngine.search(gs, TimeManager.fixed(movetime))
+    return {
+        "move": moveToText(result.bestMove) if result.bestMove else None,
+        "score": result.score,
+        "depth": result.depth,
+        "nodes": result.nodes,
+    }
+
+
+def _field(request: dict, name: str, types, default=None):
+    """Read a request field, checking its type.
+
+    Raises:
+        KeyError: If the field is missing and has no default.
+        TypeError: If the field has the wrong type.
+    """
+    if name not in request and default is not None:
+        return default
+    value = request[name]
+    # bool is an int subclass, but true is no session id or move time.
+    if not isinstance(value, types) or isinstance(value, bool):
+        raise TypeError(f"Field {name!r} has the wrong type")
+    return value
+
+
+class Session:
+    def __init__(self, sessionId: int):
+        self.id = sessionId
+        self.gs = BoardState()
+        self.validMoves = self.gs.getValidMoves()
+        self.lock = asyncio.Lock()
+
+    def state(self) -> dict:
+        gs = self.gs
+        status = "checkmate" if gs.checkmate else "stalemate" if gs.stalemate else "playing"
+        return {
+            "session": self.id,
+            "board": gs.board.tolist(),
+            "whiteMove": gs.whiteMove,
+            "moves": [moveToText(move) for move in gs.moveLog],
+            "legalMoves": [moveToText(move) for move in self.validMoves],
+            "status": status,
+        }
+
+    def play(self, move: Move):
+        self.gs.makeMove(move)
+        self.validMoves = self.gs.getValidMoves()
+
+    def undo(self):
+        if self.gs.moveLog:
+            self.gs.undoMove()
+        self.validMoves = self.gs.getValidMoves()
+
+
+class GameServer:
+    """Serve many concurrent games over a line-delimited JSON protocol.
+
+    Every request is a JSON object with a "cmd" and an optional "id" that is
+    echoed in the reply. Commands: "new", "state", "move" (with "move" in
+    coordinate notation), "undo", "go" (with an optional "movetime" in
+    seconds) and "close". A session belongs to the connection that created it:
+    other connections cannot see it, and it is dropped when that connection
+    closes. Engine searches run in a process pool so the event
+    loop only ever does board bookkeeping. The workers share a `SharedCache`,
+    so a position one of them has searched is cheap for all the others.
+
+    Each connection may have at most `maxInFlight` requests in progress; the
+    server stops reading from a connection until one of them completes, so a
+    client that floods requests is slowed down by TCP flow control instead of
+    growing our queues.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        maxInFlight: int = 8,
+        maxMovetime: float = 10.0,
+        cacheSlots: int = 1 << 20,
+    ):
+        self.sharedCache = SharedCache.create(cacheSlots) if cacheSlots else None
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_initWorker,
+            initargs=(self.sharedCache.name if self.sharedCache else None,),
+        )
+        self.maxInFlight = maxInFlight
+        self.maxMovetime = maxMovetime
+        self._sessionIds = itertools.count(1)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        server = await asyncio.start_server(self.handleConnection, host, port, limit=MAX_LINE)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        if self.sharedCache is not None:
+            self.sharedCache.close()
+
+    async def handleConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        inFlight = asyncio.Semaphore(self.maxInFlight)
+        writeLock = asyncio.Lock()
+        sessions = {}
+        tasks = set()
+        try:
+            while True:
+                await inFlight.acquire()
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    inFlight.release()
+                    await self._send(writer, writeLock, {"error": "request too long"})
+                    break
+                if not line:
+                    inFlight.release()
+                    break
+                task = asyncio.create_task(
+                    self._handleLine(line, sessions, writer, writeLock, inFlight)
+                )
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            # The client finished sending; answer what it already asked for.
+            await asyncio.gather(*tasks, return_exceptions=True)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            sessions.clear()
+            writer.close()
+
+    async def _handleLine(
+        self, line: bytes, sessions: dict, writer, writeLock: asyncio.Lock, inFlight
+    ):
+        request = None
+        try:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request must be a JSON object")
+                reply = await self.handleRequest(request, sessions)
+            except (ValueError, KeyError, TypeError) as e:
+                reply = {"error": str(e)}
+            except Exception as e:
+                # Never leave the client waiting for a reply.
+                reply = {"error": f"internal error: {e!r}"}
+            if isinstance(request, dict) and "id" in request:
+                reply["id"] = request["id"]
+            await self._send(writer, writeLock, reply)
+        except ConnectionError:
+            pass
+        finally:
+            inFlight.release()
+
+    async def _send(self, writer: asyncio.StreamWriter, writeLock: asyncio.Lock, reply: dict):
+        async with writeLock:
+            writer.write(json.dumps(reply).encode() + b"\n")
+            await writer.drain()
+
+    async def handleRequest(self, request: dict, sessions: dict) -> dict:
+        """Execute one protocol request.
+
+        Args:
+            request (dict): The decoded request.
+            sessions (dict): The sessions of the connection that sent it, by id.
+
+        Raises:
+            ValueError: If the request is malformed or illegal.
+            KeyError: If a required field is missing.
+            TypeError: If a field has the wrong type.
+
+        Returns:
+            dict: The reply, carrying the request id when one was given.
+        """
+        command = _field(request, "cmd", str)
+        if command == "new":
+            session = Session(next(self._sessionIds))
+            sessions[session.id] = session
+            reply = session.state()
+        else:
+            session = sessions.get(_field(request, "session", int))
+            if session is None:
+                raise ValueError(f"Unknown session {request['session']!r}")
+            async with session.lock:
+                if command == "state":
+                    reply = session.state()
+                elif command == "move":
+                    move = _field(request, "move", str)
+                    session.play(findMove(session.gs, move, session.validMoves))
+                    reply = session.state()
+                elif command == "undo":
+                    session.undo()
+                    reply = session.state()
+                elif command == "go":
+                    if not session.validMoves:
+                        raise ValueError("The game is over")
+                    movetime = float(_field(request, "movetime", (int, float), 1.0))
+                    if not math.isfinite(movetime):
+                        raise ValueError(f"movetime must be finite, not {movetime!r}")
+                    movetime = min(max(movetime, 0.0), self.maxMovetime)
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, searchPosition, encodePosition(session.gs), movetime
+                    )
+                    session.play(findMove(session.gs, result["move"], session.validMoves))
+                    reply = {**session.state(), "search": result}
+                elif command == "close":
+                    sessions.pop(session.id, None)
+                    reply = {"session": session.id, "closed": True}
+                else:
+                    raise ValueError(f"Unknown command {command!r}")
+        if "id" in request:
+            reply["id"] = request["id"]
+        return reply
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host concurrent chess games over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, help="engine worker processes")
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument(
+        "--cache-slots", type=int, default=1 << 20, help="shared cache entries per table (0 disables it)"
+    )
+    args = parser.parse_args()
+
+    server = GameServer(args.workers, args.max_in_flight, cacheSlots=args.cache_slots)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
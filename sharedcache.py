@@ -0,0 +1,128 @@
+from __future__ import annotations
+import struct
+import sys
+import multiprocessing
+from multiprocessing import resource_tracker, shared_memory
+
+# A slot holds (key ^ data, data). A reader accepts the slot only if the two
+# words XOR back to its key, so a slot torn by a concurrent write from another
+# process reads as a miss instead of a wrong entry, without any locking.
+SLOT = struct.Struct("=QQ")
+SCORE_BIAS = 1 << 31
+
+
+def _packResult(depth: int, score: int, flag: int, moveID: int) -> int:
+    moveCode = 0 if moveID is None else moveID + 1
+    return (
+        (score + SCORE_BIAS)
+        | min(max(depth, 0), 255) << 32
+        | flag << 40
+        | moveCode << 42
+    )
+
+
+def _unpackResult(data: int) -> tuple[int, int, int, int]:
+    moveCode = data >> 42 & 0xFFFF
+    return (
+        data >> 32 & 255,
+        (data & 0xFFFFFFFF) - SCORE_BIAS,
+        data >> 40 & 3,
+        moveCode - 1 if moveCode else None,
+    )
+
+
+class SharedCache:
+    """Static evaluations and search results shared by the processes of a host.
+
+    The cache is a `multiprocessing.shared_memory` block holding two
+    fixed-size hash tables indexed by Zobrist key: one of static evaluations
+    and one of (depth, score, flag, best move) search results in the format of
+    `Engine.tt`. One process creates the cache and the others attach to it by
+    name; every process reads and writes it without locks.
+
+    Example:
+        cache = SharedCache.create(1 << 20)
+        # in each worker
+        engine = Engine(sharedCache=SharedCache.attach(cache.name))
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        self.memory = memory
+        self.owner = owner
+        # Slot counts are powers of two, so the index is the low bits of the key.
+        # The size is rounded down as some platforms round it up to whole pages.
+        self.slots = 1 << ((memory.size // (2 * SLOT.size)).bit_length() - 1)
+        self._buffer = memory.buf
+        self._resultsOffset = self.slots * SLOT.size
+
+    @classmethod
+    def create(cls, slots: int = 1 << 20, name: str = None) -> SharedCache:
+        """Allocate a cache of `slots` entries per table, rounded down to a power of two.
+
+        The creating process owns the memory and frees it in `close`.
+        """
+        slots = 1 << (max(slots, 1).bit_length() - 1)
+        memory = shared_memory.SharedMemory(name, create=True, size=2 * slots * SLOT.size)
+        return cls(memory, True)
+
+    @classmethod
+    def attach(cls, name: str) -> SharedCache:
+        """Attach to a cache created by another process."""
+        memory = shared_memory.SharedMemory(name)
+        # Before Python 3.13 attaching registers the block with the resource
+        # tracker, which frees it when the tracker exits. Processes started by
+        # multiprocessing share the creator's tracker, but an unrelated process
+        # has its own and would free the block under everyone else's feet.
+        if sys.version_info < (3, 13) and multiprocessing.parent_process() is None:
+            resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(memory, False)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def close(self):
+        """Detach from the cache, freeing it if this process created it."""
+        self._buffer = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self) -> SharedCache:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def clear(self):
+        self._buffer[:] = bytes(len(self._buffer))
+
+    def _read(self, offset: int, key: int) -> int:
+        check, data = SLOT.unpack_from(self._buffer, offset)
+        if data and check ^ data == key:
+            return data
+        return None
+
+    def getEval(self, key: int) -> int:
+        """Return the cached static evaluation of a position, or None."""
+        data = self._read((key & (self.slots - 1)) * SLOT.size, key)
+        return None if data is None else data - SCORE_BIAS
+
+    def putEval(self, key: int, score: int):
+        data = score + SCORE_BIAS
+        SLOT.pack_into(self._buffer, (key & (self.slots - 1)) * SLOT.size, key ^ data, data)
+
+    def getResult(self, key: int) -> tuple[int, int, int, int]:
+        """Return the cached (depth, score, flag, moveID) of a position, or None."""
+        offset = self._resultsOffset + (key & (self.slots - 1)) * SLOT.size
+        data = self._read(offset, key)
+        return None if data is None else _unpackResult(data)
+
+    def putResult(self, key: int, depth: int, score: int, flag: int, moveID: int):
+        """Store a search result, keeping a deeper result of the same position."""
+        offset = self._resultsOffset + (key & (self.slots - 1)) * SLOT.size
+        data = self._read(offset, key)
+        if data is not None and data >> 32 & 255 > depth:
+            return
+        data = _packResult(depth, score, flag, moveID)
+        SLOT.pack_into(self._buffer, offset, key ^ data, data)
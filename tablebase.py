@@ -0,0 +1,464 @@
+from __future__ import annotations
+import mmap
+import os
+from array import array
+from board import BoardState, Move
+
+PIECE_ORDER = "KQRBN"
+PIECE_VALUES = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3}
+# Material that can never force mate on its own; such positions are draws.
+DRAWN_SIGNATURES = {"KvK", "KBvK", "KNvK"}
+
+ILLEGAL = -128
+MAX_PLIES = 126
+UNLOSABLE = 255
+
+KING_STEPS = [(1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1)]
+KNIGHT_STEPS = [(1, -2), (1, 2), (2, -1), (2, 1), (-1, 2), (-1, -2), (-2, 1), (-2, -1)]
+ROOK_DIRECTIONS = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, -1), (-1, 1)]
+
+
+def _rays(sq: int, directions: list[tuple[int, int]], slide: bool) -> list[list[int]]:
+    """List the squares reachable from sq in each direction, nearest first."""
+    rays = []
+    for dRow, dCol in directions:
+        ray = []
+        row, col = divmod(sq, 8)
+        for _ in range(7 if slide else 1):
+            row, col = row + dRow, col + dCol
+            if not (0 <= row <= 7 and 0 <= col <= 7):
+                break
+            ray.append(row * 8 + col)
+        if ray:
+            rays.append(ray)
+    return rays
+
+
+def _transform(sq: int, symmetry: int) -> int:
+    """Apply one of the 8 symmetries of the board: bit 0 mirrors the files,
+    bit 1 mirrors the ranks and bit 2 swaps files and ranks."""
+    row, col = divmod(sq, 8)
+    if symmetry & 4:
+        row, col = col, row
+    if symmetry & 2:
+        row = 7 - row
+    if symmetry & 1:
+        col = 7 - col
+    return row * 8 + col
+
+
+SYMMETRIES = [[_transform(sq, symmetry) for sq in range(64)] for symmetry in range(8)]
+# Without pawns or castling every position has an equivalent one with the
+# white king on a1-d1-d4, so tables only store those 10 king squares.
+KING_TRIANGLE = [sq for sq in range(64) if sq % 8 <= 3 and 7 - sq // 8 <= sq % 8]
+TRIANGLE_INDEX = {sq: i for i, sq in enumerate(KING_TRIANGLE)}
+KING_SYMMETRY = [
+    next(s for s in range(8) if SYMMETRIES[s][sq] in TRIANGLE_INDEX) for sq in range(64)
+]
+
+RAYS = {
+    "K": [_rays(sq, KING_STEPS, False) for sq in range(64)],
+    "Q": [_rays(sq, ROOK_DIRECTIONS + BISHOP_DIRECTIONS, True) for sq in range(64)],
+    "R": [_rays(sq, ROOK_DIRECTIONS, True) for sq in range(64)],
+    "B": [_rays(sq, BISHOP_DIRECTIONS, True) for sq in range(64)],
+    "N": [_rays(sq, KNIGHT_STEPS, False) for sq in range(64)],
+}
+
+
+def encodeValue(win: bool, plies: int) -> int:
+    """Pack a distance to mate into a table byte.
+
+    Args:
+        win (bool): Whether the side to move delivers the mate.
+        plies (int): The number of plies until mate.
+
+    Returns:
+        int: The signed byte stored in the table; 0 means draw.
+    """
+    return plies + 1 if win else -(plies + 1)
+
+
+def decodeValue(value: int) -> tuple[int, int]:
+    """Unpack a table byte.
+
+    Args:
+        value (int): The signed byte stored in the table.
+
+    Returns:
+        tuple[int, int]: The result for the side to move (1 win, 0 draw, -1 loss)
+            and the number of plies until mate (0 for draws).
+    """
+    if value > 0:
+        return 1, value - 1
+    if value < 0:
+        return -1, -value - 1
+    return 0, 0
+
+
+def _signature(pieces: list[tuple[str, int]]) -> str:
+    """Build the material signature, e.g. "KRvKN", of a list of (piece, square)."""
+    sides = {"w": "", "b": ""}
+    for piece, _ in pieces:
+        sides[piece[0]] += piece[1]
+    white, black = (
+        "".join(sorted(sides[color], key=PIECE_ORDER.index)) for color in "wb"
+    )
+    return f"{white}v{black}"
+
+
+def _strength(material: str) -> tuple:
+    """Order one side's material so that the stronger side sorts higher."""
+    return (
+        sum(PIECE_VALUES[p] for p in material),
+        len(material),
+        [-PIECE_ORDER.index(p) for p in material],
+    )
+
+
+def _canonical(
+    pieces: list[tuple[str, int]], whiteMove: bool
+) -> tuple[str, list[int], bool]:
+    """Map a position onto the table that stores it.
+
+    Tables always hold the stronger side as white, so positions where black is
+    stronger are mirrored vertically with the colours swapped.
+
+    Returns:
+        tuple[str, list[int], bool]: The signature, the piece squares in table
+            order and whether white is to move in the table position.
+    """
+    white, black = _signature(pieces).split("v")
+    if _strength(black) > _strength(white):
+        pieces = [
+            (("w" if p[0] == "b" else "b") + p[1], (7 - sq // 8) * 8 + sq % 8)
+            for p, sq in pieces
+        ]
+        whiteMove = not whiteMove
+    pieces = sorted(
+        pieces, key=lambda entry: ("wb".index(entry[0][0]), PIECE_ORDER.index(entry[0][1]))
+    )
+    return _signature(pieces), [sq for _, sq in pieces], whiteMove
+
+
+def _attacked(sq: int, byColor: str, pieces: list[tuple[str, int]]) -> bool:
+    """Whether a square is attacked by the given colour in a list of (piece, square)."""
+    occupied = {pieceSq for _, pieceSq in pieces}
+    for piece, pieceSq in pieces:
+        if piece[0] != byColor:
+            continue
+        for ray in RAYS[piece[1]][pieceSq]:
+            for target in ray:
+                if target == sq:
+                    return True
+                if target in occupied:
+                    break
+    return False
+
+
+def _tablePieces(signature: str) -> list[str]:
+    """List the pieces of a signature in table order, e.g. ["wK", "wR", "bK"]."""
+    white, black = signature.split("v")
+    return ["w" + p for p in white] + ["b" + p for p in black]
+
+
+class Table:
+    """A single material signature, indexed by side to move and piece squares.
+
+    The table holds one signed byte per index (see `encodeValue`). Positions
+    are first mirrored or rotated to put the white king in `KING_TRIANGLE`,
+    so there are 2 * 10 * 64 ** (n - 1) entries where n is the number of
+    pieces: 5 MB for a four-piece table.
+    """
+
+    def __init__(self, signature: str, data):
+        self.signature = signature
+        self.pieces = _tablePieces(signature)
+        self.data = data
+
+    @classmethod
+    def load(cls, path: str) -> Table:
+        """Memory map a table file.
+
+        Args:
+            path (str): The path of the table, named after its signature.
+
+        Returns:
+            Table: The mapped table.
+        """
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(os.path.basename(path).split(".")[0], memoryview(data).cast("b"))
+
+    def index(self, squares: list[int], whiteMove: bool) -> int:
+        symmetry = SYMMETRIES[KING_SYMMETRY[squares[0]]]
+        index = (0 if whiteMove else 1) * 10 + TRIANGLE_INDEX[symmetry[squares[0]]]
+        for sq in squares[1:]:
+            index = index * 64 + symmetry[sq]
+        return index
+
+    def probe(self, squares: list[int], whiteMove: bool) -> int:
+        return self.data[self.index(squares, whiteMove)]
+
+
+class Tablebases:
+    """Probe self-generated pawnless endgame tables stored in a directory.
+
+    Tables are created with `generateTable` and are memory mapped on first use.
+    Only pawnless endings of up to four pieces are practical: a four-piece table
+    takes 5 MB and tens of minutes to generate, and five pieces would need 64
+    times that. Positions with pawns, castling rights or more than `maxPieces`
+    pieces are not covered and probe as None.
+    """
+
+    def __init__(self, directory: str, maxPieces: int = 4):
+        self.directory = directory
+        self.maxPieces = maxPieces
+        self._tables = {}
+
+    def getTable(self, signature: str) -> Table:
+        """Return the table of a signature, or None if it has not been generated."""
+        if signature not in self._tables:
+            path = os.path.join(self.directory, signature + ".tb")
+            self._tables[signature] = Table.load(path) if os.path.exists(path) else None
+        return self._tables[signature]
+
+    def probePieces(self, pieces: list[tuple[str, int]], whiteMove: bool) -> int:
+        """Probe a position given as a list of (piece, square) pairs.
+
+        Returns:
+            int: The table byte of the position, or None if it is not covered.
+        """
+        signature, squares, tableWhiteMove = _canonical(pieces, whiteMove)
+        if signature in DRAWN_SIGNATURES:
+            return 0
+        table = self.getTable(signature)
+        if table is None:
+            return None
+        return table.probe(squares, tableWhiteMove)
+
+    def probe(self, gs: BoardState) -> tuple[int, int]:
+        """Look up a position.
+
+        Args:
+            gs (BoardState): The position to look up.
+
+        Returns:
+            tuple[int, int]: The result for the side to move (1 win, 0 draw, -1 loss)
+                and the plies to mate, or None when the position is not covered.
+        """
+        castleRights = gs.currentCastlingRights
+        if castleRights.wks or castleRights.wqs or castleRights.bks or castleRights.bqs:
+            return None
+        pieces = []
+        for row, rank in enumerate(gs.board.tolist()):
+            for col, piece in enumerate(rank):
+                if piece != "--":
+                    if piece[1] == "p" or len(pieces) == self.maxPieces:
+                        return None
+                    pieces.append((piece, row * 8 + col))
+        value = self.probePieces(pieces, gs.whiteMove)
+        if value is None or value == ILLEGAL:
+            return None
+        return decodeValue(value)
+
+    def filterRootMoves(self, gs: BoardState, moves: list[Move] = None) -> list[Move]:
+        """Keep only the root moves that preserve the best tablebase result.
+
+        Winning positions keep the moves with the shortest mate, lost positions
+        the moves that delay mate the longest and drawn positions every drawing
+        move. When any child is not covered the moves are returned unfiltered.
+
+        Args:
+            gs (BoardState): The root position.
+            moves (list[Move], optional): The legal moves of the position.
+                Defaults to None, in which case they are generated.
+
+        Returns:
+            list[Move]: The moves that keep the best result.
+        """
+        if moves is None:
+            moves = gs.getValidMoves()
+        scored = []
+        for move in moves:
+            gs.makeMove(move)
+            result = self.probe(gs)
+            gs.undoMove()
+            if result is None:
+                return moves
+            wdl, plies = result
+            # Score from the mover's side: quick wins first, slow losses last.
+            if wdl < 0:
+                score = 1000 - plies
+            elif wdl > 0:
+                score = -1000 + plies
+            else:
+                score = 0
+            scored.append((score, move))
+        if not scored:
+            return moves
+        best = max(score for score, _ in scored)
+        return [move for score, move in scored if score == best]
+
+
+def generateTable(signature: str, directory: str, tablebases: Tablebases = None) -> str:
+    """Generate a pawnless table by retrograde analysis and write it to disk.
+
+    Tables for the signatures reachable by a capture are generated first if
+    missing. Three-piece tables take seconds; four-piece tables are an offline
+    job of tens of minutes each.
+
+    Args:
+        signature (str): The material signature, stronger side first, e.g. "KRvK".
+        directory (str): The directory the tables are stored in.
+        tablebases (Tablebases, optional): The tablebases used to probe capture
+            results. Defaults to None, in which case one is opened on directory.
+
+    Raises:
+        ValueError: If the signature is not canonical or contains pawns.
+
+    Returns:
+        str: The path of the written table.
+    """
+    os.makedirs(directory, exist_ok=True)
+    pieces = _tablePieces(signature)
+    if any(p[1] not in PIECE_ORDER for p in pieces) or (
+        _canonical([(p, 0) for p in pieces], True)[0] != signature
+    ):
+        raise ValueError(f"{signature} is not a canonical pawnless signature")
+    tablebases = tablebases or Tablebases(directory, maxPieces=len(pieces))
+
+    n = len(pieces)
+    for i in range(n):
+        if pieces[i][1] != "K":
+            sub = _canonical([(p, 0) for j, p in enumerate(pieces) if j != i], True)[0]
+            if sub not in DRAWN_SIGNATURES and tablebases.getTable(sub) is None:
+                tablebases._tables.pop(sub)
+                generateTable(sub, directory, tablebases)
+
+    size = 2 * 64**n
+    sideStride = 64**n
+    strides = [64 ** (n - 1 - i) for i in range(n)]
+    colors = [p[0] for p in pieces]
+    kinds = [p[1] for p in pieces]
+    kings = {color: pieces.index(color + "K") for color in "wb"}
+
+    def decode(index: int) -> tuple[bool, list[int]]:
+        squares = []
+        for _ in range(n):
+            index, sq = divmod(index, 64)
+            squares.append(sq)
+        return index == 0, squares[::-1]
+
+    values = array("b", bytes(size))
+    for index in range(size):
+        whiteMove, squares = decode(index)
+        waiting = "b" if whiteMove else "w"
+        if len(set(squares)) < n or _attacked(
+            squares[kings[waiting]], "w" if whiteMove else "b", list(zip(pieces, squares))
+        ):
+            values[index] = ILLEGAL
+
+    # remaining[i] counts the legal moves of i not yet known to lose for the
+    # mover; UNLOSABLE marks positions with a capture into a drawn ending.
+    remaining = array("B", bytes(size))
+    wins = [[] for _ in range(MAX_PLIES + 2)]
+    losses = [[] for _ in range(MAX_PLIES + 2)]
+    refutedCaptures = [[] for _ in range(MAX_PLIES + 2)]
+    for index in range(size):
+        if values[index] == ILLEGAL:
+            continue
+        whiteMove, squares = decode(index)
+        mover, opponent = ("w", "b") if whiteMove else ("b", "w")
+        sideOffset = sideStride if whiteMove else -sideStride
+        occupied = {sq: i for i, sq in enumerate(squares)}
+        count = 0
+        unlosable = False
+        for i in range(n):
+            if colors[i] != mover:
+                continue
+            for ray in RAYS[kinds[i]][squares[i]]:
+                for target in ray:
+                    victim = occupied.get(target)
+                    if victim is None:
+                        child = index + sideOffset + (target - squares[i]) * strides[i]
+                        if values[child] != ILLEGAL:
+                            count += 1
+                        continue
+                    if colors[victim] == opponent:
+                        after = [
+                            (pieces[j], target if j == i else squares[j])
+                            for j in range(n)
+                            if j != victim
+                        ]
+                        kingSq = target if kinds[i] == "K" else squares[kings[mover]]
+                        if not _attacked(kingSq, opponent, after):
+                            count += 1
+                            wdl, plies = decodeValue(
+                                tablebases.probePieces(after, not whiteMove)
+                            )
+                            if wdl < 0:
+                                wins[plies + 1].append(index)
+                            elif wdl > 0:
+                                refutedCaptures[plies].append(index)
+                            else:
+                                unlosable = True
+                    break
+        if count == 0 and _attacked(
+            squares[kings[mover]], opponent, list(zip(pieces, squares))
+        ):
+            losses[0].append(index)
+        remaining[index] = UNLOSABLE if unlosable else count
+
+    for plies in range(MAX_PLIES + 1):
+        frontier = []
+        for index in (wins if plies % 2 else losses)[plies]:
+            if values[index] == 0:
+                values[index] = encodeValue(plies % 2 == 1, plies)
+                frontier.append(index)
+        for index in refutedCaptures[plies]:
+            _countDown(index, plies, values, remaining, losses)
+
+        for index in frontier:
+            whiteMove, squares = decode(index)
+            # The side that just moved is the one not to move in this position.
+            previous = "b" if whiteMove else "w"
+            sideOffset = sideStride if whiteMove else -sideStride
+            occupied = set(squares)
+            for i in range(n):
+                if colors[i] != previous:
+                    continue
+                for ray in RAYS[kinds[i]][squares[i]]:
+                    for origin in ray:
+                        if origin in occupied:
+                            break
+                        parent = index + sideOffset + (origin - squares[i]) * strides[i]
+                        if values[parent] != 0:
+                            continue
+                        if plies % 2 == 0:
+                            wins[plies + 1].append(parent)
+                        else:
+                            _countDown(parent, plies, values, remaining, losses)
+        wins[plies] = losses[plies] = refutedCaptures[plies] = None
+    if wins[MAX_PLIES + 1] or losses[MAX_PLIES + 1]:
+        raise ValueError(f"{signature} has mates longer than {MAX_PLIES} plies")
+
+    # The white king comes first in table order, so the positions with it on
+    # one square are a contiguous run; keep the runs of the triangle squares.
+    run = 64 ** (n - 1)
+    path = os.path.join(directory, signature + ".tb")
+    with open(path, "wb") as f:
+        for side in range(2):
+            for kingSq in KING_TRIANGLE:
+                start = side * sideStride + kingSq * run
+                values[start : start + run].tofile(f)
+    return path
+
+
+def _countDown(index: int, plies: int, values: array, remaining: array, losses: list):
+    """Record that one more move of index lets the opponent mate in plies."""
+    if values[index] != 0 or remaining[index] == UNLOSABLE:
+        return
+    remaining[index] -= 1
+    if remaining[index] == 0:
+        losses[plies + 1].append(index)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from board import BoardState, CastleRights  # noqa: E402
+
+
+def makeBoard(pieces: dict[str, str], whiteMove: bool = True) -> BoardState:
+    """Build a position without castling rights from {"e1": "wK", ...}."""
+    gs = BoardState()
+    gs.board = np.full((8, 8), "--", dtype=gs.board.dtype)
+    for square, piece in pieces.items():
+        row, col = 8 - int(square[1]), ord(square[0]) - ord("a")
+        gs.board[row, col] = piece
+        if piece == "wK":
+            gs.whiteKingLocation = (row, col)
+        elif piece == "bK":
+            gs.blackKingLocation = (row, col)
+    gs.whiteMove = whiteMove
+    gs.currentCastlingRights = CastleRights(False, False, False, False)
+    gs.castleRightsLog = [CastleRights(False, False, False, False)]
+    return gs
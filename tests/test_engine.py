@@ -0,0 +1,75 @@
+from board import BoardState
+from conftest import makeBoard
+from engine import MATE_SCORE, Engine, _gameKeys
+from pgn import parseSan
+from tablebase import Tablebases, generateTable
+from timemanager import TimeManager
+from zobrist import zobristKey
+
+
+def testTablebaseRootWithTooManyPieces(tmp_path):
+    # Four pieces is beyond maxPieces, but both legal moves capture into KRvK.
+    generateTable("KRvK", str(tmp_path))
+    tablebases = Tablebases(str(tmp_path), maxPieces=3)
+    gs = makeBoard({"h8": "bK", "a7": "bR", "g7": "wQ", "a1": "wK"}, whiteMove=False)
+    assert tablebases.probe(gs) is None
+
+    result = Engine(tablebases=tablebases).search(gs, maxDepth=2)
+
+    assert str(result.bestMove) in ("Kxg7", "Rxg7")
+    assert result.score > MATE_SCORE - 100
+    assert len(gs.moveLog) == 0
+
+
+def testInterruptedFirstIterationPlaysAnOrderedMove():
+    gs = BoardState()
+    for san in "e4 d5 Nf3 Nf6 Nc3 Nc6".split():
+        gs.makeMove(parseSan(gs, san))
+    generatorOrder = gs.getValidMoves()[0]
+
+    result = Engine().search(gs, TimeManager.fixed(0.0))
+
+    assert result.depth == 0
+    assert result.bestMove.is_capture and result.bestMove != generatorOrder
+
+
+def testPruningStillRunsWithoutPrincipalVariationSearch():
+    gs = BoardState()
+    for san in "e4 e5 Nf3 Nc6 Bc4 Bc5".split():
+        gs.makeMove(parseSan(gs, san))
+    engine = Engine(principalVariation=False)
+
+    engine.search(gs, maxDepth=4)
+
+    assert engine.stats.lmrReductions > 0
+    assert engine.stats.nullMoveTries > 0
+    assert engine.stats.futilityPrunes > 0
+    assert engine.stats.pvsResearches == 0
+
+
+def testGameKeysReachBackToTheLastIrreversibleMove():
+    gs = BoardState()
+    start = zobristKey(gs)
+    for san in "Nf3 Nf6 Ng1 Ng8 Nf3 Nf6".split():
+        gs.makeMove(parseSan(gs, san))
+    keys = _gameKeys(gs)
+    assert len(keys) == 6 and keys[0] == keys[4] == start
+    assert len(gs.moveLog) == 6
+
+    for san in "e4 Nc6".split():
+        gs.makeMove(parseSan(gs, san))
+    assert len(_gameKeys(gs)) == 1
+
+
+def testAnalyseInterruptedAtDepthOneKeepsTheStreamedLines():
+    engine = Engine()
+    streamed = []
+
+    def callback(depth, lines):
+        streamed.append(lines)
+        engine.stop()
+
+    lines = engine.analyse(BoardState(), multiPV=3, callback=callback)
+
+    assert len(streamed) == 1
+    assert [line.bestMove for line in lines] == [line.bestMove for line in streamed[0]]
@@ -0,0 +1,43 @@
+import threading
+
+from board import BoardState
+from instrumentation import SearchStats, phaseTimers
+
+
+def testOverlappingPhaseTimersRestoreTheClass():
+    original = BoardState.__dict__["getValidMoves"]
+    first, second = SearchStats(), SearchStats()
+    gs = BoardState()
+
+    firstBlock = phaseTimers(first)
+    firstBlock.__enter__()
+    with phaseTimers(second):
+        gs.getValidMoves()
+        firstBlock.__exit__(None, None, None)
+        gs.getValidMoves()
+    assert BoardState.__dict__["getValidMoves"] is original
+
+    gs.getValidMoves()
+    assert first.timers["getValidMoves"][0] == 1
+    assert second.timers["getValidMoves"][0] == 2
+
+
+def testPhaseTimersOnlyCountTheirOwnThread():
+    mine, theirs = SearchStats(), SearchStats()
+    entered, release = threading.Event(), threading.Event()
+
+    def other():
+        with phaseTimers(theirs):
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    entered.wait(5)
+    with phaseTimers(mine):
+        BoardState().getValidMoves()
+    release.set()
+    thread.join()
+
+    assert mine.timers["getValidMoves"][0] == 1
+    assert "getValidMoves" not in theirs.timers
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+
+from board import BoardState
+from pgn import parseSan
+from position import POSITION, PositionStore, decodeClocks, decodePosition, encodePosition
+
+
+def play(sans: str) -> BoardState:
+    gs = BoardState()
+    for san in sans.split():
+        gs.makeMove(parseSan(gs, san))
+    return gs
+
+
+@pytest.mark.parametrize(
+    "sans, clocks",
+    [
+        ("", (0, 1)),
+        ("e4 Nf6 e5 d5", (0, 3)),
+        ("Nf3 Nf6 Rg1 Rg8 Rh1", (5, 3)),
+    ],
+)
+def testEncodeDecodeRoundTrip(sans, clocks):
+    gs = play(sans)
+    data = encodePosition(gs)
+
+    decoded = decodePosition(data)
+
+    assert len(data) == POSITION.size
+    assert np.array_equal(decoded.board, gs.board)
+    assert decoded.whiteMove == gs.whiteMove
+    assert decoded.enpassantPossible == gs.enpassantPossible
+    assert vars(decoded.currentCastlingRights) == vars(gs.currentCastlingRights)
+    assert decoded.whiteKingLocation == gs.whiteKingLocation
+    assert decoded.blackKingLocation == gs.blackKingLocation
+    assert decodeClocks(data) == clocks
+    assert encodePosition(decoded, *clocks) == data
+
+
+def testStoreAddsEachPositionOnce(tmp_path):
+    path = str(tmp_path / "positions.bin")
+    positions = [play(""), play("e4"), play("e4 e5"), play("Nf3 Nf6 Ng1 Ng8")]
+    with PositionStore(path) as store:
+        numbers = [store.add(gs) for gs in positions]
+        assert numbers == [0, 1, 2, 0]
+        assert store.find(play("d4")) is None
+
+    with PositionStore(path, readOnly=True) as store:
+        assert len(store) == 3
+        assert store.find(play("e4")) == 1
+        assert np.array_equal(store.getPosition(2).board, positions[2].board)
+        assert store.records()["fullmove"].tolist() == [1, 1, 2]
+
+
+def testTornRecordIsCutOffOnOpen(tmp_path):
+    path = str(tmp_path / "positions.bin")
+    with PositionStore(path) as store:
+        store.add(play(""))
+    with open(path, "ab") as f:
+        f.write(encodePosition(play("e4"))[:10])
+
+    with PositionStore(path) as store:
+        assert len(store) == 1
+        assert store.add(play("d4")) == 1
+        assert store.find(play("d4")) == 1
+        assert np.array_equal(store.getPosition(1).board, play("d4").board)
+    assert os.path.getsize(path) == 2 * POSITION.size
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+
+from server import GameServer
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"cmd": "state", "session": [1]},
+        {"cmd": "move", "session": 1, "move": 5},
+        {"cmd": "go", "session": 1, "movetime": None},
+        {"cmd": "go", "session": 1, "movetime": float("nan")},
+        {"cmd": "go", "session": 1, "movetime": float("inf")},
+        {"cmd": 3},
+        {"session": 1},
+    ],
+)
+def testMalformedRequestsGetAnErrorReply(request_):
+    async def run():
+        server = GameServer(workers=1, cacheSlots=0)
+        try:
+            listener = await asyncio.start_server(server.handleConnection, "127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(json.dumps({"cmd": "new", "id": 0}).encode() + b"\n")
+            writer.write(json.dumps({**request_, "id": 1}).encode() + b"\n")
+            await writer.drain()
+            replies = [json.loads(await asyncio.wait_for(reader.readline(), 5)) for _ in range(2)]
+            writer.close()
+            listener.close()
+            return replies
+        finally:
+            server.close()
+
+    new, reply = asyncio.run(run())
+    assert new["session"] == 1
+    assert reply["id"] == 1 and "error" in reply
+
+
+def testSessionsBelongToTheirConnection():
+    async def request(reader, writer, payload):
+        writer.write(json.dumps(payload).encode() + b"\n")
+        await writer.drain()
+        return json.loads(await asyncio.wait_for(reader.readline(), 5))
+
+    async def run():
+        server = GameServer(workers=1, cacheSlots=0)
+        try:
+            listener = await asyncio.start_server(server.handleConnection, "127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            owner = await asyncio.open_connection("127.0.0.1", port)
+            other = await asyncio.open_connection("127.0.0.1", port)
+            session = (await request(*owner, {"cmd": "new"}))["session"]
+            foreign = await request(*other, {"cmd": "move", "session": session, "move": "e2e4"})
+            own = await request(*owner, {"cmd": "move", "session": session, "move": "e2e4"})
+            for _, writer in (owner, other):
+                writer.close()
+            listener.close()
+            return foreign, own
+        finally:
+            server.close()
+
+    foreign, own = asyncio.run(run())
+    assert "error" in foreign
+    assert "error" not in own
@@ -0,0 +1,22 @@
+import os
+
+from conftest import makeBoard
+from tablebase import SYMMETRIES, Tablebases, generateTable
+
+
+def testSymmetricPositionsShareTheirEntry(tmp_path):
+    path = generateTable("KRvK", str(tmp_path))
+    tablebases = Tablebases(str(tmp_path))
+    # Mate in one: Rh8#.
+    pieces = {"c6": "wK", "h1": "wR", "c8": "bK"}
+
+    results = set()
+    for symmetry in SYMMETRIES:
+        moved = {}
+        for square, piece in pieces.items():
+            sq = symmetry[(8 - int(square[1])) * 8 + ord(square[0]) - ord("a")]
+            moved[chr(ord("a") + sq % 8) + str(8 - sq // 8)] = piece
+        results.add(tablebases.probe(makeBoard(moved)))
+
+    assert results == {(1, 1)}
+    assert os.path.getsize(path) == 2 * 10 * 64**2
@@ -0,0 +1,26 @@
+import pytest
+
+from timemanager import TimeManager
+
+
+@pytest.mark.parametrize(
+    "remaining, increment, movesToGo",
+    [
+        (60.0, 0.0, None),
+        (60.0, 0.0, 1),
+        (60.0, 0.0, 2),
+        (10.0, 5.0, 20),
+        (0.5, 1.0, None),
+    ],
+)
+def testMaximumNeverFallsBelowOptimum(remaining, increment, movesToGo):
+    manager = TimeManager(remaining, increment, movesToGo)
+
+    assert manager.optimum <= manager.maximum < remaining
+
+
+def testLastMoveBeforeTheControlMaySpendMostOfTheClock():
+    manager = TimeManager(60.0, movesToGo=1, moveOverhead=0.0)
+
+    assert manager.optimum == 30.0
+    assert manager.maximum == 48.0
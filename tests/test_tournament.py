@@ -0,0 +1,34 @@
+import pytest
+
+from conftest import makeBoard
+from tournament import canMate, sprtBounds, sprtLlr
+
+
+@pytest.mark.parametrize(
+    "wins, draws, losses, expected",
+    [
+        (0, 10, 40, -3.63),
+        (40, 10, 0, 3.57),
+        (30, 40, 30, -0.017),
+        (45, 30, 25, 0.42),
+        (0, 0, 0, 0.0),
+        (0, 50, 0, 0.0),
+    ],
+)
+def testSprtLlr(wins, draws, losses, expected):
+    assert sprtLlr(wins, draws, losses, 0, 5) == pytest.approx(expected, abs=0.005)
+
+
+def testSprtStopsOnOneSidedMatch():
+    lower, _ = sprtBounds(0.05, 0.05)
+    assert sprtLlr(0, 10, 40, 0, 5) < lower
+
+
+def testCanMate():
+    # The side that flags with a queen against a bare king only draws.
+    gs = makeBoard({"a1": "wK", "d1": "wQ", "h8": "bK"})
+    assert canMate(gs, "w")
+    assert not canMate(gs, "b")
+    assert not canMate(makeBoard({"a1": "wK", "c1": "wN", "h8": "bK"}), "w")
+    assert canMate(makeBoard({"a1": "wK", "c1": "wN", "h8": "bK", "h7": "bp"}), "w")
+    assert canMate(makeBoard({"a1": "wK", "c1": "wB", "d1": "wN", "h8": "bK"}), "w")
@@ -0,0 +1,101 @@
+from __future__ import annotations
+import time
+
+
+class TimeManager:
+    """Allocate and track the thinking time of a single move.
+
+    The budget is split into an optimum time, which the search aims for when
+    the position is quiet, and a maximum time that is never exceeded. The
+    optimum grows when the best move keeps changing or the score drops between
+    iterations, and collapses when there is only one legal reply.
+    """
+
+    def __init__(
+        self,
+        remaining: float,
+        increment: float = 0.0,
+        movesToGo: int = None,
+        moveOverhead: float = 0.05,
+    ):
+        """Compute the budget of the move.
+
+        Args:
+            remaining (float): The time left on our clock, in seconds.
+            increment (float, optional): The increment per move, in seconds.
+                Defaults to 0.0.
+            movesToGo (int, optional): The moves left until the next time control.
+                Defaults to None, for sudden death or increment controls.
+            moveOverhead (float, optional): The time reserved per move for
+                communication and drawing, in seconds. Defaults to 0.05.
+        """
+        remaining = max(remaining - moveOverhead, 0.0)
+        movesToGo = movesToGo or 30
+        self.optimum = min(remaining / movesToGo + increment * 0.75, remaining * 0.5)
+        # The hard limit may take a larger share of the clock as the time
+        # control nears, but never less than the optimum.
+        share = min(7.5 / movesToGo, 0.8)
+        self.maximum = max(min(self.optimum * 3, remaining * share), self.optimum)
+        self.scale = 1.0
+        self.startTime = time.perf_counter()
+        self.iterationTimes = []
+        self._bestMoveChanges = 0.0
+        self._previousBestMove = None
+        self._previousScore = None
+
+    @classmethod
+    def fixed(cls, seconds: float) -> TimeManager:
+        """Create a manager that thinks for exactly the given time."""
+        manager = cls(0.0, moveOverhead=0.0)
+        manager.optimum = manager.maximum = seconds
+        return manager
+
+    def start(self):
+        """Restart the clock of the move, e.g. on a ponder hit."""
+        self.startTime = time.perf_counter()
+        self.iterationTimes = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.startTime
+
+    def setForced(self):
+        """Spend almost no time when there is a single legal reply."""
+        self.optimum = self.maximum = min(self.maximum, 0.01)
+
+    def onIteration(self, bestMove, score: int):
+        """Update the budget after a completed iteration of the search.
+
+        Args:
+            bestMove (Move): The best move found by the iteration.
+            score (int): The score of the best move, in centipawns.
+        """
+        self.iterationTimes.append(self.elapsed())
+        self._bestMoveChanges *= 0.5
+        if self._previousBestMove is not None and bestMove != self._previousBestMove:
+            self._bestMoveChanges += 1.0
+        # An unstable best move or a falling score (fail low) earns extra time.
+        self.scale = 1.0 + self._bestMoveChanges
+        if self._previousScore is not None and score < self._previousScore - 30:
+            self.scale += min((self._previousScore - score) / 100, 1.0)
+        self._previousBestMove = bestMove
+        self._previousScore = score
+
+    def canStartIteration(self) -> bool:
+        """Whether another iteration is expected to finish within the budget."""
+        elapsed = self.elapsed()
+        # The next iteration usually costs more than all previous ones together,
+        # so it is not worth starting past the middle of the budget.
+        if elapsed >= self.optimum * self.scale * 0.6:
+            return False
+        if len(self.iterationTimes) >= 2:
+            last = self.iterationTimes[-1] - self.iterationTimes[-2]
+            previous = self.iterationTimes[-2] - (
+                self.iterationTimes[-3] if len(self.iterationTimes) >= 3 else 0.0
+            )
+            branching = min(max(last / previous, 2.0), 8.0) if previous > 0 else 4.0
+            return elapsed + last * branching <= self.maximum
+        return True
+
+    def shouldStop(self) -> bool:
+        """Whether the search must stop right now."""
+        return self.elapsed() >= self.maximum
@@ -0,0 +1,363 @@
+from __future__ import annotations
+import argparse
+import json
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from board import BoardState
+from engine import Engine
+from pgn import moveToSan, parseSan, readGames, writeGame
+from timemanager import TimeManager
+from zobrist import zobristKey
+
+DEFAULT_OPENINGS = [
+    ["e4", "e5", "Nf3", "Nc6"],
+    ["e4", "c5", "Nf3", "d6"],
+    ["e4", "e6", "d4", "d5"],
+    ["e4", "c6", "d4", "d5"],
+    ["d4", "d5", "c4", "e6"],
+    ["d4", "Nf6", "c4", "g6"],
+    ["d4", "Nf6", "c4", "e6"],
+    ["c4", "e5", "Nc3", "Nf6"],
+    ["Nf3", "d5", "g3", "Nf6"],
+    ["e4", "d5", "exd5", "Qxd5"],
+]
+
+
+class Player:
+    """An engine configuration taking part in a tournament.
+
+    `options` are passed to `Engine`, so two players can differ only by a
+    search switch or table size.
+    """
+
+    def __init__(self, name: str, options: dict = None, maxDepth: int = 64):
+        self.name = name
+        self.options = options or {}
+        self.maxDepth = maxDepth
+
+    def createEngine(self) -> Engine:
+        return Engine(**self.options)
+
+
+def insufficientMaterial(gs: BoardState) -> bool:
+    """Whether neither side has the material to deliver mate.
+
+    Args:
+        gs (BoardState): The position to check.
+
+    Returns:
+        bool: True for bare kings and king and minor piece against king.
+    """
+    pieces = [piece[1] for rank in gs.board.tolist() for piece in rank if piece != "--"]
+    return len(pieces) <= 3 and all(piece in "KBN" for piece in pieces)
+
+
+def canMate(gs: BoardState, color: str) -> bool:
+    """Whether a side could deliver mate by some sequence of legal moves.
+
+    Used to adjudicate time forfeits: a side that flags only loses if its
+    opponent could still mate it.
+
+    Args:
+        gs (BoardState): The position to check.
+        color (str): The side, "w" or "b".
+
+    Returns:
+        bool: False for a bare king, and for a lone minor piece against a bare king.
+    """
+    own, other = [], []
+    for rank in gs.board.tolist():
+        for piece in rank:
+            if piece != "--" and piece[1] != "K":
+                (own if piece[0] == color else other).append(piece[1])
+    if any(piece in "pRQ" for piece in own) or len(own) >= 2:
+        return True
+    # A lone minor piece can only mate with the help of the opponent's pieces.
+    return bool(own) and bool(other)
+
+
+def playGame(
+    white: Player,
+    black: Player,
+    opening: list[str],
+    baseTime: float,
+    increment: float,
+    maxPlies: int = 400,
+) -> dict:
+    """Play one game between two engines on the clock.
+
+    Args:
+        white (Player): The player with the white pieces.
+        black (Player): The player with the black pieces.
+        opening (list[str]): The SAN moves played before the engines take over.
+        baseTime (float): The starting time of each clock, in seconds.
+        increment (float): The increment per move, in seconds.
+        maxPlies (int, optional): The game length after which it is drawn.
+            Defaults to 400.
+
+    Returns:
+        dict: The players, result, termination reason and SAN moves of the game.
+    """
+    gs = BoardState()
+    sanMoves = []
+    for san in opening:
+        move = parseSan(gs, san)
+        sanMoves.append(moveToSan(gs, move))
+        gs.makeMove(move)
+
+    engines = {True: white.createEngine(), False: black.createEngine()}
+    players = {True: white, False: black}
+    clocks = {True: baseTime, False: baseTime}
+    repetitions = {zobristKey(gs): 1}
+    halfmoveClock = 0
+    result, termination = "1/2-1/2", "max plies"
+
+    while len(sanMoves) < maxPlies:
+        validMoves = gs.getValidMoves()
+        if gs.checkmate:
+            result, termination = ("0-1" if gs.whiteMove else "1-0"), "checkmate"
+            break
+        if gs.stalemate:
+            result, termination = "1/2-1/2", "stalemate"
+            break
+        if insufficientMaterial(gs):
+            result, termination = "1/2-1/2", "insufficient material"
+            break
+        if halfmoveClock >= 100:
+            result, termination = "1/2-1/2", "fifty moves"
+            break
+
+        side = gs.whiteMove
+        timeManager = TimeManager(clocks[side], increment)
+        searchResult = engines[side].search(gs, timeManager, players[side].maxDepth)
+        clocks[side] -= timeManager.elapsed()
+        if clocks[side] < 0:
+            flagged = canMate(gs, "b" if side else "w")
+            result = ("0-1" if side else "1-0") if flagged else "1/2-1/2"
+            termination = "time forfeit"
+            break
+        clocks[side] += increment
+
+        move = searchResult.bestMove or validMoves[0]
+        sanMoves.append(moveToSan(gs, move, validMoves))
+        halfmoveClock = 0 if move.movedPiece[1] == "p" or move.is_capture else halfmoveClock + 1
+        gs.makeMove(move)
+        key = zobristKey(gs)
+        repetitions[key] = repetitions.get(key, 0) + 1
+        if repetitions[key] >= 3:
+            result, termination = "1/2-1/2", "threefold repetition"
+            break
+
+    return {
+        "white": white.name,
+        "black": black.name,
+        "result": result,
+        "termination": termination,
+        "moves": sanMoves,
+    }
+
+
+def eloDifference(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    """Estimate the Elo difference and its 95% error margin from a score.
+
+    Args:
+        wins (int): The games won by the first player.
+        draws (int): The drawn games.
+        losses (int): The games lost by the first player.
+
+    Returns:
+        tuple[float, float]: The Elo difference and the error margin.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2) / games
+
+    def elo(s: float) -> float:
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / s - 1)
+
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+def sprtLlr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """Compute the log-likelihood ratio of H1 (elo1) against H0 (elo0).
+
+    Uses the normal approximation of the trinomial game outcome model.
+
+    Returns:
+        float: The log-likelihood ratio.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score**2) / games
+    if variance == 0:
+        return 0.0
+    s0 = 1 / (1 + 10 ** (-elo0 / 400))
+    s1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+
+def sprtBounds(alpha: float, beta: float) -> tuple[float, float]:
+    """The lower and upper LLR bounds at which the test accepts H0 and H1."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def runTournament(
+    first: Player,
+    second: Player,
+    openings: list[list[str]],
+    games: int,
+    baseTime: float,
+    increment: float,
+    concurrency: int = 2,
+    pgnPath: str = None,
+    sprt: tuple[float, float, float, float] = None,
+    log=print,
+) -> dict:
+    """Play a match between two players across worker processes.
+
+    Every opening is played twice with colours reversed. Results are written
+    to the PGN file as they arrive, and the match stops early once the SPRT
+    accepts either hypothesis.
+
+    Args:
+        first (Player): The player under test.
+        second (Player): The baseline player.
+        openings (list[list[str]]): The opening suite, as SAN move lists.
+        games (int): The maximum number of games to play.
+        baseTime (float): The starting time of each clock, in seconds.
+        increment (float): The increment per move, in seconds.
+        concurrency (int, optional): The number of games played at once.
+            Defaults to 2.
+        pgnPath (str, optional): The file the games are appended to. Defaults to None.
+        sprt (tuple[float, float, float, float], optional): The elo0, elo1, alpha
+            and beta of the sequential test. Defaults to None.
+        log (callable, optional): Receives a progress line after each game.
+            Defaults to print.
+
+    Returns:
+        dict: The score, Elo estimate and SPRT state of the match.
+    """
+    schedule = []
+    for i in range(games):
+        opening = openings[(i // 2) % len(openings)]
+        schedule.append((first, second, opening) if i % 2 == 0 else (second, first, opening))
+
+    wins = draws = losses = 0
+    llr, verdict = 0.0, None
+    bounds = sprtBounds(sprt[2], sprt[3]) if sprt else None
+    pgnFile = open(pgnPath, "a") if pgnPath else None
+    startTime = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=concurrency) as executor:
+            pending = {}
+            queue = list(enumerate(schedule))
+            while queue or pending:
+                while queue and len(pending) < concurrency * 2:
+                    round_, (white, black, opening) = queue.pop(0)
+                    future = executor.submit(
+                        playGame, white, black, opening, baseTime, increment
+                    )
+                    pending[future] = round_
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    round_ = pending.pop(future)
+                    game = future.result()
+                    points = {"1-0": 1.0, "0-1": 0.0}.get(game["result"], 0.5)
+                    if game["black"] == first.name:
+                        points = 1.0 - points
+                    if points == 1.0:
+                        wins += 1
+                    elif points == 0.0:
+                        losses += 1
+                    else:
+                        draws += 1
+                    if pgnFile:
+                        writeGame(
+                            pgnFile,
+                            {
+                                "Event": f"{first.name} vs {second.name}",
+                                "Round": str(round_ + 1),
+                                "White": game["white"],
+                                "Black": game["black"],
+                                "TimeControl": f"{baseTime:g}+{increment:g}",
+                                "Termination": game["termination"],
+                            },
+                            game["moves"],
+                            game["result"],
+                        )
+                        pgnFile.flush()
+                    elo, margin = eloDifference(wins, draws, losses)
+                    line = f"+{wins} ={draws} -{losses}  Elo {elo:+.1f} +/- {margin:.1f}"
+                    if sprt:
+                        llr = sprtLlr(wins, draws, losses, sprt[0], sprt[1])
+                        line += f"  LLR {llr:.2f} [{bounds[0]:.2f}, {bounds[1]:.2f}]"
+                        if llr <= bounds[0]:
+                            verdict = "H0"
+                        elif llr >= bounds[1]:
+                            verdict = "H1"
+                    log(line)
+                if verdict:
+                    queue.clear()
+                    for future in pending:
+                        future.cancel()
+                    executor.shutdown(cancel_futures=True)
+                    break
+    finally:
+        if pgnFile:
+            pgnFile.close()
+
+    elo, margin = eloDifference(wins, draws, losses)
+    return {
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "elo": elo,
+        "margin": margin,
+        "llr": llr,
+        "sprt": verdict,
+        "seconds": time.perf_counter() - startTime,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play an engine-vs-engine match.")
+    parser.add_argument("--first", default="{}", help="JSON Engine options of the tested engine")
+    parser.add_argument("--second", default="{}", help="JSON Engine options of the baseline")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--tc", default="10+0.1", help="base+increment in seconds")
+    parser.add_argument("--openings", help="PGN file with the opening suite")
+    parser.add_argument("--opening-plies", type=int, default=8)
+    parser.add_argument("--pgn", help="PGN file to append the games to")
+    parser.add_argument(
+        "--sprt", nargs=4, type=float, metavar=("ELO0", "ELO1", "ALPHA", "BETA")
+    )
+    args = parser.parse_args()
+
+    baseTime, increment = (float(x) for x in args.tc.split("+"))
+    openings = DEFAULT_OPENINGS
+    if args.openings:
+        openings = [moves[: args.opening_plies] for _, moves in readGames(args.openings)]
+    summary = runTournament(
+        Player("first", json.loads(args.first)),
+        Player("second", json.loads(args.second)),
+        openings,
+        args.games,
+        baseTime,
+        increment,
+        args.concurrency,
+        args.pgn,
+        tuple(args.sprt) if args.sprt else None,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
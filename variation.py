@@ -0,0 +1,124 @@
+from __future__ import annotations
+from board import BoardState, Move
+
+
+class Variation:
+    """A line of moves that shares its history with the line it branched from.
+
+    A variation stores only the moves played after its branch point and a
+    reference to its parent, so branching never copies the move history and a
+    tree of analysis lines holds each move once. The board of a variation is
+    built on first use from a snapshot of the branch point and then kept up to
+    date as moves are played, so the parent's board is never touched.
+
+    Example:
+        main = Variation(BoardState())
+        main.play(e4)
+        line = main.branch()  # shares 1. e4
+        line.play(c5)
+    """
+
+    def __init__(self, start: BoardState, parent: Variation = None, branchPly: int = 0):
+        """Start a variation.
+
+        Args:
+            start (BoardState): The position at the branch point. It is used as
+                the base of the variation's board, so it must not be changed
+                afterwards.
+            parent (Variation, optional): The line this one branches from.
+                Defaults to None for a main line.
+            branchPly (int, optional): The number of the parent's plies shared by
+                this line. Defaults to 0.
+        """
+        self.start = start
+        self.parent = parent
+        self.branchPly = branchPly
+        self.moves = []
+        self.children = []
+        self._board = None
+
+    def __len__(self) -> int:
+        return self.branchPly + len(self.moves)
+
+    def moveAt(self, ply: int) -> Move:
+        """Return the move played at a ply, counted from the start of the main line."""
+        line = self
+        while ply < line.branchPly:
+            line = line.parent
+        return line.moves[ply - line.branchPly]
+
+    def history(self) -> list[Move]:
+        """All moves from the start of the main line, including the shared prefix."""
+        prefix = self.parent.history()[: self.branchPly] if self.parent else []
+        return prefix + self.moves
+
+    @property
+    def board(self) -> BoardState:
+        """The current position of the line, owned by this variation."""
+        if self._board is None:
+            self._board = self.start.copy()
+            for move in self.moves:
+                self._board.makeMove(move)
+        return self._board
+
+    def play(self, move: Move) -> Variation:
+        """Play a move at the end of this line."""
+        self.board.makeMove(move)
+        self.moves.append(move)
+        return self
+
+    def undo(self) -> Move:
+        """Take back the last move of this line.
+
+        Raises:
+            IndexError: If the line has no moves of its own left; the shared
+                prefix belongs to the parent.
+            ValueError: If a branch shares the move.
+
+        Returns:
+            Move: The move taken back.
+        """
+        if not self.moves:
+            raise IndexError("Cannot undo past the branch point")
+        if any(child.branchPly >= len(self) for child in self.children):
+            raise ValueError("The move is shared by a branch")
+        move = self.moves.pop()
+        if self._board is not None:
+            self._board.undoMove()
+        return move
+
+    def positionAt(self, ply: int) -> BoardState:
+        """Build a new board of the position after `ply` plies of this line."""
+        if ply < self.branchPly:
+            return self.parent.positionAt(ply)
+        if ply == len(self) and self._board is not None:
+            return self._board.copy()
+        gs = self.start.copy()
+        for move in self.moves[: ply - self.branchPly]:
+            gs.makeMove(move)
+        return gs
+
+    def branch(self, ply: int = None) -> Variation:
+        """Start a new line from a ply of this one.
+
+        Args:
+            ply (int, optional): The number of plies the new line shares with this
+                one. Defaults to None, branching from the current position.
+
+        Returns:
+            Variation: The new line.
+        """
+        if ply is None:
+            ply = len(self)
+        if not 0 <= ply <= len(self):
+            raise IndexError(f"No ply {ply} in a line of {len(self)}")
+        line = self
+        while ply < line.branchPly:
+            line = line.parent
+        if ply == line.branchPly:
+            # The branch point of this line already has a snapshot to share.
+            child = Variation(line.start, line, ply)
+        else:
+            child = Variation(line.positionAt(ply), line, ply)
+        line.children.append(child)
+        return child
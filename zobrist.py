@@ -0,0 +1,55 @@
+from __future__ import annotations
+import random
+
+PIECES = ["bp", "wp", "bN", "wN", "bB", "wB", "bR", "wR", "bQ", "wQ", "bK", "wK"]
+PIECE_INDEX = {piece: i for i, piece in enumerate(PIECES)}
+
+# A fixed seed keeps the keys identical across processes and runs, so hashes
+# written to disk (opening books, position stores) stay valid.
+_rng = random.Random(0x5EED_C0DE)
+PIECE_KEYS = [[_rng.getrandbits(64) for _ in range(64)] for _ in PIECES]
+CASTLE_KEYS = [_rng.getrandbits(64) for _ in range(4)]  # wks, wqs, bks, bqs
+ENPASSANT_KEYS = [_rng.getrandbits(64) for _ in range(8)]
+TURN_KEY = _rng.getrandbits(64)
+
+
+def zobristKey(gs) -> int:
+    """Compute the 64-bit Zobrist hash of the given position.
+
+    The layout follows the Polyglot convention: one key per piece and square,
+    one per castling right, one per en passant file (only when a pawn of the
+    side to move can actually capture en passant) and one for white to move.
+
+    Args:
+        gs (BoardState): The position to hash.
+
+    Returns:
+        int: The hash of the position.
+    """
+    key = 0
+    for row, rank in enumerate(gs.board.tolist()):
+        for col, piece in enumerate(rank):
+            if piece != "--":
+                key ^= PIECE_KEYS[PIECE_INDEX[piece]][row * 8 + col]
+
+    castleRights = gs.currentCastlingRights
+    if castleRights.wks:
+        key ^= CASTLE_KEYS[0]
+    if castleRights.wqs:
+        key ^= CASTLE_KEYS[1]
+    if castleRights.bks:
+        key ^= CASTLE_KEYS[2]
+    if castleRights.bqs:
+        key ^= CASTLE_KEYS[3]
+
+    if gs.enpassantPossible:
+        epRow, epCol = gs.enpassantPossible
+        pawn, pawnRow = ("wp", epRow + 1) if gs.whiteMove else ("bp", epRow - 1)
+        for col in (epCol - 1, epCol + 1):
+            if 0 <= col <= 7 and gs.board[pawnRow, col] == pawn:
+                key ^= ENPASSANT_KEYS[epCol]
+                break
+
+    if gs.whiteMove:
+        key ^= TURN_KEY
+    return key